@@ -1,4 +1,5 @@
 from iconservice import InterfaceScore, Address, interface
+from typing import List
 
 class StakingScoreInterface(InterfaceScore):
     
@@ -9,3 +10,7 @@ class StakingScoreInterface(InterfaceScore):
     @interface
     def withdraw_funds(self, reviewer: Address, amount: int):
         pass
+
+    @interface
+    def withdraw_funds_batch(self, reviewers: List[Address], amounts: List[int]):
+        pass
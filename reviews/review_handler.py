@@ -2,12 +2,15 @@ from iconservice import (
     IconScoreBase, 
     IconScoreDatabase, 
     VarDB, 
+    DictDB, 
     Address, 
     json_dumps, 
     revert
 )
 
 from .scorelib.bag import BagDB
+from .scorelib.set import SetDB
+from .utils.codec import encode_review, decode_review, hash_to_bytes
 
 
 class ReviewHandler:
@@ -15,24 +18,110 @@ class ReviewHandler:
     Used for creating, retrieving, deleting and keeping track of reviews.
     """
 
+    # Version of the storage layout, bumped whenever a migration step is added.
+    VERSION = 4
+
+    # Maximum number of reviews returned by a single page.
+    MAX_PAGE_SIZE = 100
+
+    # Maximum number of guids that can be requested in a single batch.
+    MAX_BATCH_SIZE = 100
+
+    # Properties of a review that can be projected in a page.
+    REVIEW_FIELDS = ("guid", "hash", "reviewer", "stake", "submission", "expiration")
+
+    # Width of an expiration bucket in microseconds (one day).
+    EXPIRATION_BUCKET_SIZE = 86_400 * 10**6
+
+    # Maximum number of expiration buckets visited by a single lookup.
+    MAX_BUCKET_SCAN = 100
+
+    # Stored in the record of a legacy review whose hash is not a 32 bytes hex string.
+    # The original hash is then kept in its legacy VarDB.
+    MALFORMED_HASH = bytes(32)
+
     def __init__(
         self, var_key: str, db: IconScoreDatabase, score=IconScoreBase
     ) -> None:
         self._name = var_key
-        self._guids = BagDB(f"{self._name}_guids", db, value_type=int)
+        self._guids = SetDB(f"{self._name}_guids", db, value_type=int)
+        self._records = DictDB(f"{self._name}_records", db, value_type=bytes)
+        self._reviewer_stakes = DictDB(f"{self._name}_reviewer_stakes", db, value_type=int)
+        # Every bucket below this one is empty.
+        self._first_expiration_bucket = VarDB(
+            f"{self._name}_first_expiration_bucket", db, value_type=int
+        )
+        self._version = VarDB(f"{self._name}_version", db, value_type=int)
         self._db = db
         self._score = score
 
+    def migrate(self) -> None:
+        """
+        Bring the storage of an existing contract up to date with the current layout.
+        Should be called from the on_update method of the contract.
+        """
+        version = self._version.get()
+
+        if version < 1:
+            # Guids used to be stored in a BagDB without any index.
+            legacy_guids = BagDB(f"{self._name}_guids", self._db, value_type=int)
+            for guid in legacy_guids:
+                self._guids.add(guid)
+            legacy_guids.clear()
+
+        if version < 2:
+            # Reviews used to be stored as one VarDB per property.
+            for guid in self._guids:
+                self._migrate_legacy_review(guid)
+
+        if version < 3:
+            # Index the reviews by expiration bucket.
+            first_bucket = None
+            for guid in self._guids:
+                bucket = self._expiration_bucket_id(_Review(guid, self._db, self).expiration)
+                self._expiration_bucket(bucket).add(guid)
+                if first_bucket is None or bucket < first_bucket:
+                    first_bucket = bucket
+            if first_bucket is not None:
+                self._first_expiration_bucket.set(first_bucket)
+
+        if version < 4:
+            # Index the reviews and their total stake by reviewer.
+            for guid in self._guids:
+                review = _Review(guid, self._db, self)
+                reviewer = review.reviewer
+                self._reviewer_guids(reviewer).add(guid)
+                self._reviewer_stakes[reviewer] += review.stake
+
+        self._version.set(ReviewHandler.VERSION)
+
     def create_review(
         self, guid: int, hash: str, expiration: int, reviewer: Address, stake: int
     ) -> None:
-        review = _Review(guid, self._db, self)
-        review._guid.set(guid)
-        review._hash.set(hash)
-        review._reviewer.set(reviewer)
-        review._stake.set(stake)
-        review._submission.set(self._score.now())
-        review._expiration.set(expiration)
+        if guid in self._guids:
+            revert('Review already exists.')
+        try:
+            hash = hash_to_bytes(hash)
+        except ValueError:
+            revert('Review hash must be a 32 bytes hex string.')
+        now = self._score.now()
+        # A review expiring in the past would move the first expiration bucket
+        # behind buckets that the sweeper has already pruned.
+        if expiration <= now:
+            revert('Expiration must be in the future.')
+
+        self._records[guid] = encode_review(
+            hash, reviewer, stake, now, expiration
+        )
+
+        bucket = self._expiration_bucket_id(expiration)
+        if not len(self._guids) or bucket < self._first_expiration_bucket.get():
+            self._first_expiration_bucket.set(bucket)
+        self._expiration_bucket(bucket).add(guid)
+
+        self._reviewer_guids(reviewer).add(guid)
+        self._reviewer_stakes[reviewer] += stake
+
         self._guids.add(guid)
 
     def remove_review(self, guid: int) -> None:
@@ -40,25 +129,172 @@ class ReviewHandler:
         review.remove()
 
     def get_review(self, guid: int):
-        if not guid in self._guids:
+        record = self._records[guid]
+        if record is None:
             revert('Review does not exist.')
-        return _Review(guid, self._db, self)
+        return _Review(guid, self._db, self, record)
 
-    def get_reviews(self, guids: list) -> list:
+    def get_review_hash(self, guid: int) -> str:
+        """
+        Returns the hash of a review, or None if the review does not exist.
+        """
+        record = self._records[guid]
+        if record is None:
+            return None
+        return self._hash_to_str(guid, decode_review(record)[0])
+
+    def get_reviews(self, guids: list) -> tuple:
+        """
+        Returns the reviews of the given guids, and the guids that have no review.
+        """
         reviews = []
-        for guid in self._guids:
-            reviews.append(self.get_review(guid))
-        return reviews
+        missing = []
+        for guid in guids:
+            record = self._records[guid]
+            if record is not None:
+                reviews.append(_Review(guid, self._db, self, record))
+            else:
+                missing.append(guid)
+        return reviews, missing
     
     def get_review_count(self) -> int:
         return len(self._guids)
 
-    ## For testing.
+    def get_reviews_page(self, cursor: int, limit: int) -> tuple:
+        """
+        Returns up to `limit` reviews starting at position `cursor`, along with
+        the cursor of the next page, or -1 if there are no more reviews.
+        Removing reviews moves the last review into the freed position, so a
+        listing that runs across removals may miss or repeat some reviews.
+        """
+        return self._get_page(self._guids, cursor, limit)
+
+    def get_reviews_by_reviewer(self, reviewer: Address, cursor: int, limit: int) -> tuple:
+        """
+        Same as get_reviews_page, restricted to the reviews of a given reviewer.
+        """
+        return self._get_page(self._reviewer_guids(reviewer), cursor, limit)
+
+    def get_reviewer_stake(self, reviewer: Address) -> int:
+        return self._reviewer_stakes[reviewer]
+
+    def get_expired_reviews(self, before: int, limit: int) -> list:
+        """
+        Returns up to `limit` reviews that expired before the `before` timestamp,
+        oldest expiration buckets first. At most MAX_BUCKET_SCAN buckets and `limit`
+        reviews are visited, so fewer reviews are returned when the bucket of `before`
+        holds reviews that have not expired yet.
+        """
+        if not 0 < limit <= ReviewHandler.MAX_BATCH_SIZE:
+            revert(f'Limit must be between 1 and {ReviewHandler.MAX_BATCH_SIZE}.')
+
+        reviews = []
+        visited = 0
+        last_bucket = self._expiration_bucket_id(before)
+        bucket = self._first_expiration_bucket.get()
+        end = min(last_bucket + 1, bucket + ReviewHandler.MAX_BUCKET_SCAN)
+
+        while bucket < end:
+            for guid in self._expiration_bucket(bucket):
+                if visited == limit:
+                    return reviews
+                visited += 1
+                review = _Review(guid, self._db, self)
+                # Only the last bucket can hold reviews expiring after `before`.
+                if bucket < last_bucket or review.expiration < before:
+                    reviews.append(review)
+            bucket += 1
+
+        return reviews
+
+    def prune_expiration_buckets(self, before: int) -> None:
+        """
+        Move the first expiration bucket past the empty buckets preceding the
+        `before` timestamp. At most MAX_BUCKET_SCAN buckets are visited, unless
+        there are no reviews left, in which case it moves straight to the bucket of `before`.
+        """
+        last_bucket = self._expiration_bucket_id(before)
+        bucket = self._first_expiration_bucket.get()
+        if not len(self._guids):
+            self._first_expiration_bucket.set(max(bucket, last_bucket))
+            return
+
+        end = min(last_bucket, bucket + ReviewHandler.MAX_BUCKET_SCAN)
+
+        while bucket < end and not len(self._expiration_bucket(bucket)):
+            bucket += 1
+        self._first_expiration_bucket.set(bucket)
+
+    ## For testing. Unbounded, use get_reviews_page instead.
     def get_all_reviews(self) -> list:
         guids = []
         for guid in self._guids:
             guids.append(guid)
-        return self.get_reviews(guids)
+        reviews, _ = self.get_reviews(guids)
+        return reviews
+
+    def _get_page(self, guids: SetDB, cursor: int, limit: int) -> tuple:
+        if cursor < 0:
+            revert('Cursor can not be negative.')
+        if not 0 < limit <= ReviewHandler.MAX_PAGE_SIZE:
+            revert(f'Limit must be between 1 and {ReviewHandler.MAX_PAGE_SIZE}.')
+
+        count = len(guids)
+        end = min(cursor + limit, count)
+        reviews = []
+        for index in range(cursor, end):
+            reviews.append(_Review(guids[index], self._db, self))
+
+        next_cursor = end if end < count else -1
+        return reviews, next_cursor
+
+    def _reviewer_guids(self, reviewer: Address) -> SetDB:
+        return SetDB(f"{self._name}_reviewer_{reviewer}", self._db, value_type=int)
+
+    def _expiration_bucket_id(self, expiration: int) -> int:
+        return expiration // ReviewHandler.EXPIRATION_BUCKET_SIZE
+
+    def _expiration_bucket(self, bucket: int) -> SetDB:
+        return SetDB(f"{self._name}_expiration_{bucket}", self._db, value_type=int)
+
+    def _migrate_legacy_review(self, guid: int) -> None:
+        name = str(guid) + _Review.NAME
+        legacy = {
+            "guid": VarDB(f"{name}_guid", self._db, value_type=int),
+            "hash": self._legacy_hash(guid),
+            "reviewer": VarDB(f"{name}_reviewer", self._db, value_type=Address),
+            "stake": VarDB(f"{name}_stake", self._db, value_type=int),
+            "submission": VarDB(f"{name}_submission", self._db, value_type=int),
+            "expiration": VarDB(f"{name}_expiration", self._db, value_type=int),
+        }
+
+        try:
+            hash = hash_to_bytes(legacy["hash"].get())
+        except ValueError:
+            # Legacy hashes were not validated, keep the malformed ones as they are.
+            hash = ReviewHandler.MALFORMED_HASH
+            del legacy["hash"]
+
+        self._records[guid] = encode_review(
+            hash,
+            legacy["reviewer"].get(),
+            legacy["stake"].get(),
+            legacy["submission"].get(),
+            legacy["expiration"].get(),
+        )
+
+        for var in legacy.values():
+            var.remove()
+
+    def _legacy_hash(self, guid: int) -> VarDB:
+        return VarDB(f"{guid}{_Review.NAME}_hash", self._db, value_type=str)
+
+    def _hash_to_str(self, guid: int, hash: bytes) -> str:
+        if hash == ReviewHandler.MALFORMED_HASH:
+            legacy_hash = self._legacy_hash(guid).get()
+            if legacy_hash:
+                return legacy_hash
+        return hash.hex()
 
 
 class _Review:
@@ -66,57 +302,69 @@ class _Review:
     This is an internal structure of the class ReviewHandler. Reviews should not
     be created outside of the ReviewHandler class. Use the review object to alter, interact
     or delete them from the contract database.
+    The record of the review is read at most once and cached for the lifetime of the object.
     """
 
+    # Key prefix of the legacy per property storage layout.
     NAME = "_review"
 
     def __init__(
-        self, guid: int, db: IconScoreDatabase, review_handler: ReviewHandler
+        self,
+        guid: int,
+        db: IconScoreDatabase,
+        review_handler: ReviewHandler,
+        record: bytes = None,
     ) -> None:
-
-        # Key to get database interfaces for review with this guid.
-        self._name = str(guid) + _Review.NAME
+        self._guid = guid
 
         # Reviewhandler and score instance.
         self._score = review_handler._score
         self._review_handler = review_handler
         self._db = db
 
-        # DB interface for review properties.
-        self._guid = VarDB(f"{self._name}_guid", self._db, value_type=int)
-        self._hash = VarDB(f"{self._name}_hash", self._db, value_type=str)
-        self._reviewer = VarDB(f"{self._name}_reviewer", self._db, value_type=Address)
-        self._stake = VarDB(f"{self._name}_stake", self._db, value_type=int)
-        self._submission = VarDB(f"{self._name}_submission", self._db, value_type=int)
-        self._expiration = VarDB(f"{self._name}_expiration", self._db, value_type=int)
+        # Encoded and decoded record, loaded on first access unless already known.
+        self._record = record
+        self._fields = None
 
     @property
     def guid(self) -> int:
-        return self._guid.get()
+        return self._guid
 
     @property
     def hash(self) -> str:
-        return self._hash.get()
+        return self._review_handler._hash_to_str(self._guid, self._load()[0])
 
     @property
     def reviewer(self) -> Address:
-        return self._reviewer.get()
+        return self._load()[1]
 
     @property
     def stake(self) -> int:
-        return self._stake.get()
+        return self._load()[2]
 
     @property
     def submission(self) -> int:
-        return self._submission.get()
+        return self._load()[3]
 
     @property
     def expiration(self) -> int:
-        return self._expiration.get()
+        return self._load()[4]
 
     @hash.setter
     def hash(self, hash: str) -> None:
-        self._hash.set(hash)
+        old_hash, reviewer, stake, submission, expiration = self._load()
+        try:
+            hash = hash_to_bytes(hash)
+        except ValueError:
+            revert('Review hash must be a 32 bytes hex string.')
+        if hash == old_hash:
+            return
+
+        if old_hash == ReviewHandler.MALFORMED_HASH:
+            self._review_handler._legacy_hash(self._guid).remove()
+        self._record = encode_review(hash, reviewer, stake, submission, expiration)
+        self._fields = (hash, reviewer, stake, submission, expiration)
+        self._review_handler._records[self._guid] = self._record
 
     def has_expired(self) -> bool:
         if self._score.now() > self.expiration:
@@ -124,23 +372,52 @@ class _Review:
         else:
             return False
 
-    def to_dict(self) -> dict:
-        rev_dict = {
-            "guid": self.guid,
-            "hash": self.hash,
-            "reviewer": self.reviewer,
-            "stake": self.stake,
-            "submission": self.submission,
-            "expiration": self.expiration,
-        }
-        return rev_dict
+    def to_dict(self, fields: list = None) -> dict:
+        """
+        Returns the review as a dict, optionally restricted to the given fields.
+        The record is only read if a field other than the guid is requested.
+        """
+        if fields is None:
+            fields = ReviewHandler.REVIEW_FIELDS
+
+        rev_dict = {"guid": self._guid}
+        if any(field != "guid" for field in fields):
+            hash, reviewer, stake, submission, expiration = self._load()
+            rev_dict.update(
+                {
+                    "hash": self._review_handler._hash_to_str(self._guid, hash),
+                    "reviewer": reviewer,
+                    "stake": stake,
+                    "submission": submission,
+                    "expiration": expiration,
+                }
+            )
+        return {field: rev_dict[field] for field in fields}
 
     def remove(self) -> None:
-        guid = self.guid
-        self._guid.remove()
-        self._hash.remove()
-        self._reviewer.remove()
-        self._stake.remove()
-        self._submission.remove()
-        self._expiration.remove()
-        self._review_handler._guids.remove(guid)
+        handler = self._review_handler
+        # The cached record may belong to a review that has been removed since.
+        if self._guid not in handler._guids:
+            revert('Review does not exist.')
+        hash, reviewer, stake, _, expiration = self._load()
+
+        bucket = handler._expiration_bucket_id(expiration)
+        handler._expiration_bucket(bucket).remove(self._guid)
+        handler._reviewer_guids(reviewer).remove(self._guid)
+        handler._reviewer_stakes[reviewer] -= stake
+        handler._records.remove(self._guid)
+        if hash == ReviewHandler.MALFORMED_HASH:
+            handler._legacy_hash(self._guid).remove()
+        handler._guids.remove(self._guid)
+
+        self._record = None
+        self._fields = None
+
+    def _load(self) -> tuple:
+        if self._fields is None:
+            if self._record is None:
+                self._record = self._review_handler._records[self._guid]
+                if self._record is None:
+                    revert('Review does not exist.')
+            self._fields = decode_review(self._record)
+        return self._fields
@@ -14,10 +14,12 @@ class Reviews(IconScoreBase):
 
     def on_install(self) -> None:
         super().on_install()
+        self._review_handler.migrate()
         self._admin.set(Address.from_string("hxf3ebaeabffbf6c3413f2ff0046ca40105bb8ac3f"))
 
     def on_update(self) -> None:
         super().on_update()
+        self._review_handler.migrate()
 
     @external
     @only_owner
@@ -50,35 +52,82 @@ class Reviews(IconScoreBase):
         staking_score = self.create_interface_score(self._staking_score.get(), StakingScoreInterface)
         staking_score.deposit_funds(self.msg.sender, self.msg.value)
 
+    @payable
+    @external
+    def submit_reviews(self, reviews: str) -> None:
+        """
+        Submit several reviews at once. Transfer their summed funds to staking contract.
+        Takes a json string array of {"guid", "hash", "expiration", "stake"} objects as input,
+        the stakes must add up to the transferred value.
+        """
+        try:
+            reviews = json_loads(reviews)
+        except ValueError:
+            revert("Reviews must be a json array.")
+        if not isinstance(reviews, list):
+            revert("Reviews must be a json array.")
+        if len(reviews) > ReviewHandler.MAX_BATCH_SIZE:
+            revert(f"Can not submit more than {ReviewHandler.MAX_BATCH_SIZE} reviews at once.")
+
+        total_stake = 0
+        for review in reviews:
+            self._check_review_item(review)
+            if review["stake"] < 0:
+                revert("Stake can not be negative.")
+            total_stake += review["stake"]
+        if total_stake != self.msg.value:
+            revert("The stakes of the reviews must add up to the transferred value.")
+
+        for review in reviews:
+            self._review_handler.create_review(
+                review["guid"], review["hash"], review["expiration"], self.msg.sender, review["stake"]
+            )
+
+        # All the reviews belong to the sender, so their stake is deposited at once.
+        self.icx.transfer(self._staking_score.get(), self.msg.value)
+        staking_score = self.create_interface_score(self._staking_score.get(), StakingScoreInterface)
+        staking_score.deposit_funds(self.msg.sender, self.msg.value)
+
     @external
     def remove_review(self, guid: int) -> None:
         """
         Remove a review. Withdraw funds from staking contract.
         """
         review = self._review_handler.get_review(guid)
-
-        if review.has_expired():
-            pass
-        elif review.reviewer == self.msg.sender:
-            pass
-        else:
-            revert(
-                "In order to remove a review, you must either be the owner, or the review has to have expired."
-            )
+        self._check_removable(review)
 
         staking_score = self.create_interface_score(self._staking_score.get(), StakingScoreInterface)
         staking_score.withdraw_funds(review.reviewer, review.stake)
         review.remove()
 
     @external
-    def remove_reviews(self, guids: str):
+    def sweep_expired_reviews(self, limit: int = 100) -> None:
+        """
+        Remove up to `limit` expired reviews and withdraw their funds from staking contract.
+        """
+        now = self.now()
+        reviews = self._review_handler.get_expired_reviews(now, limit)
+        self._remove_and_withdraw(reviews)
+        self._review_handler.prune_expiration_buckets(now)
+
+    @external
+    def remove_reviews(self, guids: List[int]):
         """
         Removes specified reviews and withdraw funds from staking contract.
-        Takes a json string array as input.
+        Funds are withdrawn with a single call, grouped per reviewer.
         """
-        guids = json_loads(guids)
+        if len(guids) > ReviewHandler.MAX_BATCH_SIZE:
+            revert(f"Can not remove more than {ReviewHandler.MAX_BATCH_SIZE} reviews at once.")
+        if len(set(guids)) != len(guids):
+            revert("Guids must be unique.")
+
+        reviews = []
         for guid in guids:
-            self.remove_review(guid)
+            review = self._review_handler.get_review(guid)
+            self._check_removable(review)
+            reviews.append(review)
+
+        self._remove_and_withdraw(reviews)
 
     @external(readonly=True)
     def authenticate_review(
@@ -103,6 +152,69 @@ class Reviews(IconScoreBase):
         else:
             return False
 
+    @external(readonly=True)
+    def get_reviews_by_reviewer(
+        self, address: Address, cursor: int = 0, limit: int = 100
+    ) -> dict:
+        """
+        Returns a page of at most `limit` reviews of a reviewer starting at `cursor`,
+        and the cursor of the next page (-1 once every review has been listed).
+        """
+        reviews, next_cursor = self._review_handler.get_reviews_by_reviewer(
+            address, cursor, limit
+        )
+        return {
+            "reviews": [review.to_dict() for review in reviews],
+            "next_cursor": next_cursor,
+        }
+
+    @external(readonly=True)
+    def get_reviewer_stake(self, address: Address) -> int:
+        """
+        Returns the total amount staked by a reviewer on their current reviews.
+        """
+        return self._review_handler.get_reviewer_stake(address)
+
+    @external(readonly=True)
+    def get_expired_reviews(self, before: int = 0, limit: int = 100) -> list:
+        """
+        Returns up to `limit` reviews that expired before the `before` timestamp.
+        Defaults to the current timestamp.
+        """
+        if not before:
+            before = self.now()
+        reviews = self._review_handler.get_expired_reviews(before, limit)
+        return [review.to_dict() for review in reviews]
+
+    @external(readonly=True)
+    def authenticate_reviews(self, items: str) -> list:
+        """
+        Check the authenticity of several reviews, at most MAX_BATCH_SIZE (100) per call.
+        Takes a json string array of [guid, review_message, review_score, expiration, prep, reviewer]
+        arrays as input. Returns a list of booleans, False for reviews that do not exist.
+        """
+        try:
+            items = json_loads(items)
+        except ValueError:
+            revert("Items must be a json array.")
+        if not isinstance(items, list):
+            revert("Items must be a json array.")
+        if len(items) > ReviewHandler.MAX_BATCH_SIZE:
+            revert(f"Can not authenticate more than {ReviewHandler.MAX_BATCH_SIZE} reviews at once.")
+        for item in items:
+            self._check_authentication_item(item)
+
+        hashes = {}
+        results = []
+        for guid, review_message, review_score, expiration, prep, reviewer in items:
+            if guid not in hashes:
+                hashes[guid] = self._review_handler.get_review_hash(guid)
+            hash = self._compute_review_hash(
+                guid, review_message, review_score, expiration, prep, reviewer
+            )
+            results.append(hashes[guid] == hash)
+        return results
+
     ## For testing.
     @external(readonly=True)
     def get_all_reviews(self) -> list:
@@ -110,6 +222,43 @@ class Reviews(IconScoreBase):
         reviews = [review.to_dict() for review in reviews]
         return reviews
 
+    @external(readonly=True)
+    def get_reviews_page(
+        self, cursor: int = 0, limit: int = 100, fields: List[str] = None
+    ) -> dict:
+        """
+        Returns a page of at most `limit` reviews starting at `cursor`, and the
+        cursor of the next page (-1 once every review has been listed).
+        `fields` optionally restricts which properties of each review are returned.
+        """
+        if fields:
+            for field in fields:
+                if field not in ReviewHandler.REVIEW_FIELDS:
+                    revert(f"Unknown review field: {field}.")
+        else:
+            fields = None
+
+        reviews, next_cursor = self._review_handler.get_reviews_page(cursor, limit)
+        return {
+            "reviews": [review.to_dict(fields) for review in reviews],
+            "next_cursor": next_cursor,
+        }
+
+    @external(readonly=True)
+    def get_reviews_by_guids(self, guids: List[int]) -> dict:
+        """
+        Returns the reviews of the given guids, at most MAX_BATCH_SIZE (100) per call.
+        Guids that have no review are listed under "missing" instead of reverting.
+        """
+        if len(guids) > ReviewHandler.MAX_BATCH_SIZE:
+            revert(f"Can not fetch more than {ReviewHandler.MAX_BATCH_SIZE} reviews at once.")
+
+        reviews, missing = self._review_handler.get_reviews(guids)
+        return {
+            "reviews": [review.to_dict() for review in reviews],
+            "missing": missing,
+        }
+
     @external(readonly=True)
     def get_review(self, guid: int) -> dict:
         review = self._review_handler.get_review(guid)
@@ -119,6 +268,58 @@ class Reviews(IconScoreBase):
     def get_current_timestamp(self) -> int:
         return self.now()
 
+    def _check_removable(self, review) -> None:
+        if review.has_expired():
+            pass
+        elif review.reviewer == self.msg.sender:
+            pass
+        else:
+            revert(
+                "In order to remove a review, you must either be the owner, or the review has to have expired."
+            )
+
+    def _check_review_item(self, review) -> None:
+        """
+        Revert unless a review of a batch is a {"guid", "hash", "expiration", "stake"} object.
+        """
+        if not isinstance(review, dict):
+            revert("Each review must be a json object.")
+        for key in ("guid", "expiration", "stake"):
+            value = review.get(key)
+            if not isinstance(value, int) or isinstance(value, bool):
+                revert(f"Review {key} must be an integer.")
+        if not isinstance(review.get("hash"), str):
+            revert("Review hash must be a string.")
+
+    def _check_authentication_item(self, item) -> None:
+        """
+        Revert unless an item of a batch is a [guid, review_message, review_score, expiration, prep, reviewer] array.
+        """
+        if not isinstance(item, list) or len(item) != 6:
+            revert("Each item must be an array of 6 elements.")
+        keys = ("guid", "review_message", "review_score", "expiration", "prep", "reviewer")
+        for key, value_type, value in zip(keys, (int, str, int, int, str, str), item):
+            if value_type is int and (not isinstance(value, int) or isinstance(value, bool)):
+                revert(f"Item {key} must be an integer.")
+            if value_type is str and not isinstance(value, str):
+                revert(f"Item {key} must be a string.")
+
+    def _remove_and_withdraw(self, reviews: list) -> None:
+        """
+        Remove reviews and withdraw their funds from staking contract, summed per reviewer.
+        """
+        stakes = {}
+        for review in reviews:
+            reviewer = review.reviewer
+            stakes[reviewer] = stakes.get(reviewer, 0) + review.stake
+            review.remove()
+
+        if not stakes:
+            return
+
+        staking_score = self.create_interface_score(self._staking_score.get(), StakingScoreInterface)
+        staking_score.withdraw_funds_batch(list(stakes.keys()), list(stakes.values()))
+
     def _compute_review_hash(
         self,
         guid: int,
@@ -0,0 +1,33 @@
+import unittest
+
+from iconservice import Address
+from ..utils.codec import encode_review, decode_review, hash_to_bytes
+
+REVIEWER = Address.from_string("hxaea72c7d11c1e41c51d2110379b71023c5fa6d19")
+HASH = bytes(range(32))
+
+
+class TestCodec(unittest.TestCase):
+
+    def test_round_trip(self):
+        record = encode_review(HASH, REVIEWER, 40, 1_600_000_000_000_000, 1_700_000_000_000_000)
+        self.assertEqual(
+            decode_review(record),
+            (HASH, REVIEWER, 40, 1_600_000_000_000_000, 1_700_000_000_000_000)
+        )
+
+    def test_round_trip_edge_values(self):
+        for value in (0, 1, -1, 127, 128, 255, 256, -128, -129, 10**30, 2**256, -(2**256)):
+            record = encode_review(HASH, REVIEWER, value, value, value)
+            self.assertEqual(decode_review(record), (HASH, REVIEWER, value, value, value))
+
+    def test_round_trip_contract_reviewer(self):
+        reviewer = Address.from_string("cx1000000000000000000000000000000000000000")
+        record = encode_review(HASH, reviewer, 1, 2, 3)
+        self.assertEqual(decode_review(record), (HASH, reviewer, 1, 2, 3))
+
+    def test_hash_to_bytes(self):
+        self.assertEqual(hash_to_bytes(HASH.hex()), HASH)
+        for hash in ("", "hash1", "fffffff", HASH.hex()[:-2]):
+            with self.assertRaises(ValueError):
+                hash_to_bytes(hash)
@@ -49,7 +49,7 @@
 #        review_handler = self.score._review_handler
 #        review_handler.create_review(1, "hash1", 100, self.score.msg.sender, self.score.msg.value)
 #        review_handler.create_review(2, "hash2", 200, self.score.msg.sender, self.score.msg.value)
-#        reviews = review_handler.get_reviews([1,2])
+#        reviews, _ = review_handler.get_reviews([1,2])
 #        review_1 = reviews[0]
 #        review_2 = reviews[1]
 #
@@ -74,3 +74,147 @@
 #
 #    def test_get_all_reviews(self):
 #        pass
+
+
+from iconservice import Address, VarDB
+from ..reviews import Reviews
+from ..review_handler import ReviewHandler
+from iconservice import IconScoreException
+from tbears.libs.scoretest.score_test_case import ScoreTestCase
+
+
+class TestReviewHandlerMigration(ScoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.score = self.get_score_instance(Reviews, self.test_account1)
+        self.review_handler = self.score._review_handler
+
+    def create_legacy_review(self, guid: int, hash: str) -> None:
+        name = f"{guid}_review"
+        VarDB(f"{name}_guid", self.score.db, value_type=int).set(guid)
+        VarDB(f"{name}_hash", self.score.db, value_type=str).set(hash)
+        VarDB(f"{name}_reviewer", self.score.db, value_type=Address).set(self.test_account1)
+        VarDB(f"{name}_stake", self.score.db, value_type=int).set(40)
+        VarDB(f"{name}_submission", self.score.db, value_type=int).set(10)
+        VarDB(f"{name}_expiration", self.score.db, value_type=int).set(100)
+        self.review_handler._guids.add(guid)
+
+    def test_migrate_legacy_reviews(self):
+        valid_hash = "ff" * 32
+        self.create_legacy_review(1, valid_hash)
+        self.create_legacy_review(2, "hash1")
+        self.review_handler._version.set(1)
+        self.review_handler.migrate()
+
+        self.assertEqual(self.review_handler.get_review(1).hash, valid_hash)
+        self.assertEqual(self.review_handler.get_review(2).hash, "hash1")
+        self.assertEqual(self.review_handler.get_review_hash(2), "hash1")
+        self.assertEqual(self.review_handler.get_reviewer_stake(self.test_account1), 80)
+
+        self.review_handler.get_review(2).hash = valid_hash
+        self.assertEqual(self.review_handler.get_review(2).hash, valid_hash)
+        self.assertEqual(self.review_handler._legacy_hash(2).get(), "")
+
+        with self.assertRaises(IconScoreException):
+            self.review_handler.get_review(1).hash = "hash1"
+
+
+class TestReview(ScoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.score = self.get_score_instance(Reviews, self.test_account1)
+        self.review_handler = self.score._review_handler
+
+    def test_remove_review_twice(self):
+        self.review_handler.create_review(1, "ff" * 32, self.score.now() + 100, self.test_account1, 40)
+        review = self.review_handler.get_review(1)
+        same_review = self.review_handler.get_review(1)
+        review.remove()
+
+        with self.assertRaises(IconScoreException):
+            same_review.remove()
+        self.assertEqual(self.review_handler.get_reviewer_stake(self.test_account1), 0)
+        self.assertEqual(self.review_handler.get_review_count(), 0)
+
+
+class TestExpiredReviews(ScoreTestCase):
+    DAY = ReviewHandler.EXPIRATION_BUCKET_SIZE
+    START = 18_000 * ReviewHandler.EXPIRATION_BUCKET_SIZE
+    STAKING_SCORE = Address.from_string("cx1000000000000000000000000000000000000000")
+
+    def setUp(self):
+        super().setUp()
+        self.score = self.get_score_instance(Reviews, self.test_account1)
+        self.score._staking_score.set(self.STAKING_SCORE)
+        self.register_interface_score(self.STAKING_SCORE)
+        self.review_handler = self.score._review_handler
+        self.set_block(1, self.START)
+
+    def create_review(self, guid: int, expiration: int) -> None:
+        self.review_handler.create_review(guid, f"{guid:064x}", expiration, self.test_account1, 10)
+
+    def expired_guids(self, before: int, limit: int = 100) -> list:
+        return [review.guid for review in self.review_handler.get_expired_reviews(before, limit)]
+
+    def test_create_review_in_the_past(self):
+        for expiration in (self.START, 0, -10**30):
+            with self.assertRaises(IconScoreException):
+                self.create_review(1, expiration)
+        self.assertEqual(self.review_handler.get_review_count(), 0)
+
+    def test_get_expired_reviews(self):
+        self.create_review(1, self.START + 1)
+        self.create_review(2, self.START + 2)
+        self.create_review(3, self.START + 5 * self.DAY)
+
+        self.assertEqual(self.expired_guids(self.START + 2), [1])
+        self.assertEqual(self.expired_guids(self.START + 10), [1, 2])
+        self.assertEqual(self.expired_guids(self.START + 10, 1), [1])
+        self.assertEqual(self.expired_guids(self.START + 10 * self.DAY), [1, 2, 3])
+
+    def test_get_expired_reviews_visits_limit_reviews(self):
+        # Reviews of the current bucket that have not expired count toward the limit.
+        for guid in range(1, 4):
+            self.create_review(guid, self.START + 10 + guid)
+        self.create_review(4, self.START + 1)
+
+        self.assertEqual(self.expired_guids(self.START + 5, 2), [])
+        self.assertEqual(self.expired_guids(self.START + 5, 4), [4])
+
+    def test_sweep_expired_reviews(self):
+        for guid in range(1, 6):
+            self.create_review(guid, self.START + guid)
+        self.create_review(6, self.START + 300 * self.DAY)
+
+        self.set_block(2, self.START + self.DAY)
+        self.score.sweep_expired_reviews(3)
+        self.assertEqual(self.review_handler.get_review_count(), 3)
+        self.score.sweep_expired_reviews(3)
+        self.assertEqual(self.review_handler.get_review_count(), 1)
+
+        # The empty buckets preceding the current one are pruned.
+        self.set_block(3, self.START + 10 * self.DAY)
+        self.score.sweep_expired_reviews(3)
+        self.assertEqual(
+            self.review_handler._first_expiration_bucket.get(),
+            self.review_handler._expiration_bucket_id(self.START + 10 * self.DAY)
+        )
+
+        # A lookup visits at most MAX_BUCKET_SCAN buckets, pruning catches up over several sweeps.
+        self.set_block(4, self.START + 301 * self.DAY)
+        self.assertEqual(self.expired_guids(self.START + 301 * self.DAY), [])
+        for _ in range(3):
+            self.score.sweep_expired_reviews(3)
+        self.assertEqual(self.review_handler.get_review_count(), 0)
+
+    def test_prune_without_reviews(self):
+        self.create_review(1, self.START + 1)
+        self.set_block(2, self.START + 1000 * self.DAY)
+        self.score.sweep_expired_reviews(3)
+        self.assertEqual(self.review_handler.get_review_count(), 0)
+
+        self.review_handler.prune_expiration_buckets(self.START + 1000 * self.DAY)
+        self.assertEqual(
+            self.review_handler._first_expiration_bucket.get(),
+            self.review_handler._expiration_bucket_id(self.START + 1000 * self.DAY)
+        )
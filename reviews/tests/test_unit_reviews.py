@@ -29,3 +29,59 @@
 #        self.assertEqual(res["guid"], guid)
 #        self.assertEqual(res["hash"], msg_hash)
 #        self.assertEqual(res["expiration"], expiration)
+
+
+import json
+
+from iconservice import Address, IconScoreException, VarDB
+from ..reviews import Reviews
+from tbears.libs.scoretest.score_test_case import ScoreTestCase
+
+PREP = "hx1000000000000000000000000000000000000000"
+
+
+class TestAuthenticateReviews(ScoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.score = self.get_score_instance(Reviews, self.test_account1)
+        self.expiration = self.score.now() + 100
+
+    def create_review(self, guid: int, review_message: str) -> list:
+        item = [guid, review_message, 5, self.expiration, PREP, str(self.test_account1)]
+        hash = self.score._compute_review_hash(*item)
+        self.score._review_handler.create_review(guid, hash, self.expiration, self.test_account1, 10)
+        return item
+
+    def test_authenticate_reviews(self):
+        item = self.create_review(1, "good")
+        forged = [1, "bad", 5, self.expiration, PREP, str(self.test_account1)]
+        missing = [2, "good", 5, self.expiration, PREP, str(self.test_account1)]
+
+        results = self.score.authenticate_reviews(json.dumps([item, forged, item, missing]))
+        self.assertEqual(results, [True, False, True, False])
+
+    def test_authenticate_legacy_review(self):
+        # Malformed legacy hashes are kept as is, so they never match a computed hash.
+        item = [3, "good", 5, self.expiration, PREP, str(self.test_account1)]
+        name = "3_review"
+        VarDB(f"{name}_hash", self.score.db, value_type=str).set("hash1")
+        VarDB(f"{name}_reviewer", self.score.db, value_type=Address).set(self.test_account1)
+        self.score._review_handler._guids.add(3)
+        self.score._review_handler._version.set(1)
+        self.score._review_handler.migrate()
+
+        self.assertEqual(self.score.authenticate_reviews(json.dumps([item])), [False])
+
+    def test_authenticate_invalid_items(self):
+        item = self.create_review(1, "good")
+        invalid_items = [
+            "nope",
+            json.dumps({}),
+            json.dumps([item[:5]]),
+            json.dumps([["1"] + item[1:]]),
+            json.dumps([item[:1] + [5] + item[2:]]),
+            json.dumps([item[:4] + [1] + item[5:]]),
+        ]
+        for items in invalid_items:
+            with self.assertRaises(IconScoreException):
+                self.score.authenticate_reviews(items)
@@ -0,0 +1,66 @@
+from ..reviews import Reviews
+from ..scorelib.set import SetDB, ItemNotFound
+from tbears.libs.scoretest.score_test_case import ScoreTestCase
+
+
+class TestSetDB(ScoreTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.score = self.get_score_instance(Reviews, self.test_account1)
+        self.set = SetDB("test", self.score.db, value_type=int)
+
+    def assert_consistent(self):
+        # Every item must be indexed by its own slot.
+        for slot, item in enumerate(self.set):
+            self.assertEqual(self.set._index[item], slot + 1)
+
+    def test_add(self):
+        self.set.add(1)
+        self.set.add(2)
+        self.set.add(1)
+        self.assertEqual(list(self.set), [1, 2])
+        self.assertEqual(len(self.set), 2)
+        self.assertIn(1, self.set)
+        self.assertNotIn(3, self.set)
+        self.assert_consistent()
+
+    def test_remove_swaps_last_item(self):
+        for item in range(1, 6):
+            self.set.add(item)
+        self.set.remove(2)
+        self.assertEqual(list(self.set), [1, 5, 3, 4])
+        self.assertNotIn(2, self.set)
+        self.assert_consistent()
+
+        self.set.remove(4)
+        self.assertEqual(list(self.set), [1, 5, 3])
+        self.assert_consistent()
+
+    def test_remove_missing_item(self):
+        self.set.add(1)
+        self.set.remove(2)
+        self.assertEqual(list(self.set), [1])
+        self.assert_consistent()
+
+    def test_remove_and_add_again(self):
+        self.set.add(1)
+        self.set.add(2)
+        self.set.remove(1)
+        self.set.add(1)
+        self.assertEqual(list(self.set), [2, 1])
+        self.assert_consistent()
+
+    def test_clear(self):
+        for item in range(1, 4):
+            self.set.add(item)
+        self.set.clear()
+        self.assertEqual(len(self.set), 0)
+        for item in range(1, 4):
+            self.assertNotIn(item, self.set)
+
+    def test_check_exists(self):
+        self.set.add(1)
+        self.set.check_exists(1)
+        with self.assertRaises(ItemNotFound):
+            self.set.check_exists(2)
@@ -0,0 +1,65 @@
+from iconservice import Address
+
+# Packed layout of a review record, the guid being the key of the record:
+#
+#   hash        32 bytes     raw sha256 digest of the review
+#   reviewer    21 bytes     address prefix followed by the address body
+#   stake       1 + n bytes  length followed by a signed big endian integer
+#   submission  1 + n bytes  length followed by a signed big endian integer
+#   expiration  1 + n bytes  length followed by a signed big endian integer
+
+HASH_SIZE = 32
+ADDRESS_SIZE = 21
+
+
+def hash_to_bytes(hash: str) -> bytes:
+    """
+    Convert a hex encoded review hash to its raw form.
+    Raises a ValueError if the hash is not a 32 bytes hex string.
+    """
+    raw = bytes.fromhex(hash)
+    if len(raw) != HASH_SIZE:
+        raise ValueError(f"Review hash must be {HASH_SIZE} bytes long.")
+    return raw
+
+
+def encode_review(
+    hash: bytes, reviewer: Address, stake: int, submission: int, expiration: int
+) -> bytes:
+    """
+    Pack the properties of a review into a single record.
+    """
+    record = bytearray(hash)
+    record += reviewer.to_bytes_including_prefix()
+    for value in (stake, submission, expiration):
+        record += _encode_int(value)
+    return bytes(record)
+
+
+def decode_review(record: bytes) -> tuple:
+    """
+    Unpack a review record into (hash, reviewer, stake, submission, expiration).
+    """
+    offset = HASH_SIZE + ADDRESS_SIZE
+    hash = record[:HASH_SIZE]
+    reviewer = Address.from_bytes_including_prefix(record[HASH_SIZE:offset])
+
+    values = []
+    for _ in range(3):
+        value, offset = _decode_int(record, offset)
+        values.append(value)
+
+    stake, submission, expiration = values
+    return hash, reviewer, stake, submission, expiration
+
+
+def _encode_int(value: int) -> bytes:
+    raw = value.to_bytes((value.bit_length() + 8) // 8, "big", signed=True)
+    return bytes([len(raw)]) + raw
+
+
+def _decode_int(record: bytes, offset: int) -> tuple:
+    size = record[offset]
+    start = offset + 1
+    end = start + size
+    return int.from_bytes(record[start:end], "big", signed=True), end
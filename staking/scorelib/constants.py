@@ -9,4 +9,7 @@ class Score:
     system = Address.from_string("cx0000000000000000000000000000000000000000")
 
 
-MAX_ITERATION_LOOP = 100
\ No newline at end of file
+MAX_ITERATION_LOOP = 100
+
+# Maximum number of P-Reps a single address can delegate to.
+MAX_DELEGATIONS = 100
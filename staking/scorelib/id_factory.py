@@ -14,5 +14,10 @@ class IdFactory:
     def get_uid(self) -> int:
         # UID = 0 is forbidden in order to prevent conflict with uninitialized uid
         # Starts with UID 1
-        self._uid.set(self._uid.get() + 1)
-        return self._uid.get()
\ No newline at end of file
+        return self.get_uid_block(1)
+
+    def get_uid_block(self, count: int) -> int:
+        # Reserves `count` consecutive identifiers and returns the first one
+        first_uid = self._uid.get() + 1
+        self._uid.set(first_uid + count - 1)
+        return first_uid
\ No newline at end of file
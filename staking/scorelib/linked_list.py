@@ -1,4 +1,4 @@
-from iconservice  import IconScoreDatabase, VarDB
+from iconservice  import IconScoreDatabase, VarDB, DictDB
 from .id_factory import IdFactory
 from .constants import MAX_ITERATION_LOOP
 
@@ -19,6 +19,14 @@ class LinkedNodeCannotMoveItself(Exception):
     pass
 
 
+class InvalidLimit(Exception):
+    pass
+
+
+class LinkedNodeInvalidValueType(Exception):
+    pass
+
+
 class _NodeDB:
     # NodeDB is an item of the LinkedListDB
     # Its structure is internal and shouldn't be manipulated outside of this module
@@ -29,12 +37,35 @@ class _NodeDB:
 
     def __init__(self, var_key: str, db: IconScoreDatabase, value_type: type):
         self._name = var_key + _NodeDB._NAME
-        self._init = VarDB(f'{self._name}_init', db, int)
-        self._value = VarDB(f'{self._name}_value', db, value_type)
-        self._next = VarDB(f'{self._name}_next', db, int)
-        self._prev = VarDB(f'{self._name}_prev', db, int)
+        self._value_type = value_type
+        self._vars = {}
         self._db = db
 
+    # The VarDBs of a node are only created once they are accessed
+
+    def _var(self, suffix: str, value_type: type) -> VarDB:
+        var = self._vars.get(suffix)
+        if var is None:
+            var = VarDB(f'{self._name}_{suffix}', self._db, value_type)
+            self._vars[suffix] = var
+        return var
+
+    @property
+    def _init(self) -> VarDB:
+        return self._var('init', int)
+
+    @property
+    def _value(self) -> VarDB:
+        return self._var('value', self._value_type)
+
+    @property
+    def _next(self) -> VarDB:
+        return self._var('next', int)
+
+    @property
+    def _prev(self) -> VarDB:
+        return self._var('prev', int)
+
     def delete(self) -> None:
         self._value.remove()
         self._prev.remove()
@@ -63,21 +94,136 @@ class _NodeDB:
     def set_prev(self, prev_id: int) -> None:
         self._prev.set(prev_id)
 
+    def set(self, value, prev_id: int, next_id: int) -> None:
+        # Initializes a new node, empty links are not written
+        self.set_value(value)
+        if prev_id:
+            self.set_prev(prev_id)
+        if next_id:
+            self.set_next(next_id)
+
+
+class _PackedNodeDB:
+    # PackedNodeDB is an item of a LinkedListDB using the packed layout
+    # The whole node is stored as a single bytes entry of a DictDB :
+    #   prev   1 + n bytes  length followed by an unsigned big endian integer
+    #   next   1 + n bytes  length followed by an unsigned big endian integer
+    #   value  n bytes      the rest of the entry
+    # The entry is read once, then every write rewrites it entirely
+    # Its structure is internal and shouldn't be manipulated outside of this module
+
+    def __init__(self, node_id: int, nodes: DictDB):
+        self._node_id = node_id
+        self._nodes = nodes
+        self._loaded = False
+        self._exists = False
+        self._value = b''
+        self._prev = 0
+        self._next = 0
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        record = self._nodes[self._node_id]
+        if record is not None:
+            self._prev, offset = _PackedNodeDB._decode_id(record, 0)
+            self._next, offset = _PackedNodeDB._decode_id(record, offset)
+            self._value = record[offset:]
+            self._exists = True
+        self._loaded = True
+
+    def _save(self) -> None:
+        record = bytearray()
+        record += _PackedNodeDB._encode_id(self._prev)
+        record += _PackedNodeDB._encode_id(self._next)
+        record += self._value
+        self._nodes[self._node_id] = bytes(record)
+        self._exists = True
+
+    @staticmethod
+    def _encode_id(node_id: int) -> bytes:
+        raw = node_id.to_bytes((node_id.bit_length() + 7) // 8, 'big')
+        return bytes([len(raw)]) + raw
+
+    @staticmethod
+    def _decode_id(record: bytes, offset: int) -> tuple:
+        end = offset + 1 + record[offset]
+        return int.from_bytes(record[offset + 1:end], 'big'), end
+
+    def delete(self) -> None:
+        self._nodes.remove(self._node_id)
+        self._loaded = True
+        self._exists = False
+        self._value = b''
+        self._prev = 0
+        self._next = 0
+
+    def exists(self) -> bool:
+        self._load()
+        return self._exists
+
+    def get_value(self) -> bytes:
+        self._load()
+        return self._value
+
+    def set_value(self, value: bytes) -> None:
+        self._load()
+        self._value = value
+        self._save()
+
+    def get_next(self) -> int:
+        self._load()
+        return self._next
+
+    def set_next(self, next_id: int) -> None:
+        self._load()
+        self._next = next_id
+        self._save()
+
+    def get_prev(self) -> int:
+        self._load()
+        return self._prev
+
+    def set_prev(self, prev_id: int) -> None:
+        self._load()
+        self._prev = prev_id
+        self._save()
+
+    def set(self, value: bytes, prev_id: int, next_id: int) -> None:
+        # Writes the whole node at once
+        self._loaded = True
+        self._value = value
+        self._prev = prev_id
+        self._next = next_id
+        self._save()
+
 
 class LinkedListDB:
     # LinkedListDB is an iterable collection of items double linked by unique IDs.
     # Order of retrieval is preserved.
     # Circular linked listing or duplicates nodes in the same linkedlist is *not allowed*
     # in order to prevent infinite loops.
+    # An optional codec translates values to their stored form : it must provide an
+    # encode(value) method returning a value_type and a decode(stored) method doing the opposite.
+    # With the optional packed layout, every node is stored as a single DictDB entry, which
+    # requires a bytes value_type. Node handles are then shared by all the operations of the
+    # linkedlist instance, so a node is read at most once.
 
     _NAME = '_LINKED_LISTDB'
 
-    def __init__(self, var_key: str, db: IconScoreDatabase, value_type: type):
+    def __init__(self, var_key: str, db: IconScoreDatabase, value_type: type, codec=None, packed=False):
         self._name = var_key + LinkedListDB._NAME
         self._head_id = VarDB(f'{self._name}_head_id', db, int)
         self._tail_id = VarDB(f'{self._name}_tail_id', db, int)
         self._length = VarDB(f'{self._name}_length', db, int)
         self._value_type = value_type
+        self._codec = codec
+        self._packed = packed
+        if packed:
+            if value_type is not bytes:
+                raise LinkedNodeInvalidValueType(self._name, value_type)
+            self._nodes = DictDB(f'{self._name}_nodes', db, bytes)
+            self._node_handles = {}
         self._db = db
 
     def delete(self) -> None:
@@ -90,27 +236,71 @@ class LinkedListDB:
         return self._length.get()
 
     def __iter__(self):
-        cur_id = self._head_id.get()
+        return self.iter_from()
+
+    def iter_from(self, cur_id: int = 0, limit: int = None):
+        # Iterate over at most `limit` nodes, starting from a given node id or from the head
+        # The tail id is read once, and the existence of a node is only checked when its
+        # stored value is empty, which still detects a broken chain
+        if not cur_id:
+            cur_id = self._head_id.get()
 
         # Empty linked list
         if not cur_id:
-            return iter(())
+            return
 
-        node = self._get_node(cur_id)
-        yield (cur_id, node.get_value())
         tail_id = self._tail_id.get()
+        count = 0
 
         # Iterate until tail
-        while cur_id != tail_id:
-            cur_id = node.get_next()
-            node = self._get_node(cur_id)
-            yield (cur_id, node.get_value())
-            tail_id = self._tail_id.get()
+        while limit is None or count < limit:
+            node = self._node(cur_id)
+            value = node.get_value()
+            if not value and not node.exists():
+                raise LinkedNodeNotFound(self._name, cur_id)
+            yield (cur_id, self._decode(value))
+            count += 1
+
+            if cur_id == tail_id:
+                return
+            next_id = node.get_next()
+            if not next_id:
+                raise LinkedNodeNotFound(self._name, cur_id)
+            cur_id = next_id
+
+    def _encode(self, value):
+        if self._codec is None:
+            return value
+        return self._codec.encode(value)
+
+    def _decode(self, value):
+        if self._codec is None:
+            return value
+        return self._codec.decode(value)
 
     def _node(self, node_id) -> _NodeDB:
-        return _NodeDB(str(node_id) + self._name, self._db, self._value_type)
+        if not self._packed:
+            return _NodeDB(str(node_id) + self._name, self._db, self._value_type)
+
+        node = self._node_handles.get(node_id)
+        if node is None:
+            node = _PackedNodeDB(node_id, self._nodes)
+            self._node_handles[node_id] = node
+        return node
 
-    def _create_node(self, value, node_id: int = None) -> tuple:
+    def pack_nodes(self) -> None:
+        # Move the nodes stored with the unpacked layout to the packed layout of this linkedlist
+        # Only meant to be used when migrating an existing linkedlist
+        cur_id = self._head_id.get()
+        while cur_id:
+            legacy = _NodeDB(str(cur_id) + self._name, self._db, self._value_type)
+            next_id = legacy.get_next()
+            self._node(cur_id).set(legacy.get_value(), legacy.get_prev(), next_id)
+            legacy.delete()
+            cur_id = next_id
+
+    def _create_node(self, value, node_id: int = None, prev_id: int = 0, next_id: int = 0) -> tuple:
+        # The node is created with its links, so a packed node is written once
         if node_id is None:
             node_id = IdFactory(self._name + '_nodedb', self._db).get_uid()
 
@@ -120,7 +310,7 @@ class LinkedListDB:
         if node.exists():
             raise LinkedNodeAlreadyExists(self._name, node_id)
 
-        node.set_value(value)
+        node.set(self._encode(value), prev_id, next_id)
         return (node_id, node)
 
     def _get_node(self, node_id: int) -> _NodeDB:
@@ -143,7 +333,11 @@ class LinkedListDB:
 
     def node_value(self, cur_id: int):
         # Returns the value of a given node id 
-        return self._get_node(cur_id).get_value()
+        return self._decode(self._get_node(cur_id).get_value())
+
+    def set_node_value(self, cur_id: int, value) -> None:
+        # Replaces the value of a given node id
+        self._get_node(cur_id).set_value(self._encode(value))
 
     def head_value(self):
         # Returns the value of the head of the linkedlist 
@@ -198,41 +392,70 @@ class LinkedListDB:
 
     def append(self, value, node_id: int = None) -> int:
         # Append an element at the end of the linkedlist 
-        cur_id, cur = self._create_node(value, node_id)
+        length = self._length.get()
+        tail_id = self._tail_id.get() if length else 0
+        cur_id, _ = self._create_node(value, node_id, prev_id=tail_id)
 
-        if self._length.get() == 0:
+        if not tail_id:
             # Empty LinkedList
             self._head_id.set(cur_id)
             self._tail_id.set(cur_id)
         else:
             # Append to tail
-            tail = self._get_tail_node()
+            tail = self._get_node(tail_id)
             tail.set_next(cur_id)
-            cur.set_prev(self._tail_id.get())
             # Update tail to cur node
             self._tail_id.set(cur_id)
 
-        self._length.set(self._length.get() + 1)
+        self._length.set(length + 1)
 
         return cur_id
 
+    def extend(self, values: list) -> list:
+        # Append several elements at the end of the linkedlist at once
+        # Returns the ids of the new nodes
+        if not values:
+            return []
+
+        first_id = IdFactory(self._name + '_nodedb', self._db).get_uid_block(len(values))
+        node_ids = list(range(first_id, first_id + len(values)))
+        tail_id = self._tail_id.get()
+
+        prev_id = tail_id
+        for index, node_id in enumerate(node_ids):
+            next_id = node_ids[index + 1] if index + 1 < len(node_ids) else 0
+            self._create_node(values[index], node_id, prev_id, next_id)
+            prev_id = node_id
+
+        if tail_id:
+            # Append to tail
+            self._get_node(tail_id).set_next(first_id)
+        else:
+            # Empty LinkedList
+            self._head_id.set(first_id)
+        self._tail_id.set(node_ids[-1])
+        self._length.set(self._length.get() + len(values))
+
+        return node_ids
+
     def prepend(self, value, node_id: int = None) -> int:
         # Prepend an element at the beginning of the linkedlist 
-        cur_id, cur = self._create_node(value, node_id)
+        length = self._length.get()
+        head_id = self._head_id.get() if length else 0
+        cur_id, _ = self._create_node(value, node_id, next_id=head_id)
 
-        if self._length.get() == 0:
+        if not head_id:
             # Empty LinkedList
             self._head_id.set(cur_id)
             self._tail_id.set(cur_id)
         else:
             # Prepend to head
-            head = self._get_head_node()
+            head = self._get_node(head_id)
             head.set_prev(cur_id)
-            cur.set_next(self._head_id.get())
             # Update head to cur node
             self._head_id.set(cur_id)
 
-        self._length.set(self._length.get() + 1)
+        self._length.set(length + 1)
 
         return cur_id
 
@@ -242,19 +465,16 @@ class LinkedListDB:
             return self.append(value, node_id)
 
         after = self._get_node(after_id)
-        cur_id, cur = self._create_node(value, node_id)
-
         afternext_id = after.get_next()
         afternext = self._get_node(afternext_id)
 
+        # cur>pid, cur>nid
+        cur_id, _ = self._create_node(value, node_id, prev_id=after_id, next_id=afternext_id)
+
         # after>nid
         after.set_next(cur_id)
         # after>next>pid
         afternext.set_prev(cur_id)
-        # cur>nid
-        cur.set_next(afternext_id)
-        # cur>pid
-        cur.set_prev(after_id)
 
         self._length.set(self._length.get() + 1)
         return cur_id
@@ -265,19 +485,16 @@ class LinkedListDB:
             return self.prepend(value, node_id)
 
         before = self._get_node(before_id)
-        cur_id, cur = self._create_node(value, node_id)
-
         beforeprev_id = before.get_prev()
         beforeprev = self._get_node(beforeprev_id)
 
+        # cur>pid, cur>nid
+        cur_id, _ = self._create_node(value, node_id, prev_id=beforeprev_id, next_id=before_id)
+
         # before>pid
         before.set_prev(cur_id)
         # before>prev>nid
         beforeprev.set_next(cur_id)
-        # cur>nid
-        cur.set_next(before_id)
-        # cur>pid
-        cur.set_prev(beforeprev_id)
 
         self._length.set(self._length.get() + 1)
         return cur_id
@@ -462,6 +679,55 @@ class LinkedListDB:
             old_tail.delete()
             self._length.set(self._length.get() - 1)
 
+    def pop_head(self, count: int) -> list:
+        # Remove up to `count` nodes from the head of the linkedlist
+        # Returns the values of the removed nodes, in order
+        length = self._length.get()
+        count = min(count, length)
+        if count <= 0:
+            return []
+
+        values = []
+        node_id = self._head_id.get()
+        for _ in range(count):
+            node = self._get_node(node_id)
+            values.append(self._decode(node.get_value()))
+            next_id = node.get_next()
+            node.delete()
+            node_id = next_id
+
+        if count == length:
+            self._head_id.remove()
+            self._tail_id.remove()
+            self._length.set(0)
+        else:
+            self._get_node(node_id).set_prev(0)
+            self._head_id.set(node_id)
+            self._length.set(length - count)
+
+        return values
+
+    def truncate_before(self, cur_id: int) -> int:
+        # Remove all the nodes preceding a given node, which becomes the head of the linkedlist
+        # Returns the number of removed nodes
+        cur = self._get_node(cur_id)
+        node_id = self._head_id.get()
+        count = 0
+
+        while node_id != cur_id:
+            node = self._get_node(node_id)
+            next_id = node.get_next()
+            node.delete()
+            node_id = next_id
+            count += 1
+
+        if count:
+            cur.set_prev(0)
+            self._head_id.set(cur_id)
+            self._length.set(self._length.get() - count)
+
+        return count
+
     def remove(self, cur_id: int) -> None:
         # Remove a given node from the linkedlist 
         if cur_id == self._head_id.get():
@@ -481,6 +747,30 @@ class LinkedListDB:
             cur.delete()
             self._length.set(self._length.get() - 1)
 
+    def select_from(self, cursor: int = 0, limit: int = MAX_ITERATION_LOOP, cond=None, **kwargs) -> tuple:
+        # Returns the nodes among the `limit` nodes starting at node id `cursor` (or the head)
+        # that optionally fulfill a condition, and the node id to continue from (-1 once the
+        # end is reached). No node preceding the cursor is read, so deep pages cost O(limit).
+        if limit <= 0:
+            raise InvalidLimit(self._name, limit)
+
+        result = []
+        if cursor < 0:
+            return result, -1
+
+        next_cursor = -1
+        for count, node in enumerate(self.iter_from(cursor, limit + 1)):
+            if count == limit:
+                next_cursor = node[0]
+                break
+            if cond:
+                if cond(self._db, node, **kwargs):
+                    result.append(node)
+            else:
+                result.append(node)
+
+        return result, next_cursor
+
     def select(self, offset: int, cond=None, **kwargs) -> list:
         # Returns a limited amount of items in the LinkedListDB that optionally fulfills a condition 
         items = iter(self)
@@ -2,16 +2,20 @@ from iconservice import *
 
 from .interfaces.system_score import SystemScoreInterface
 
-from .scorelib.constants import Score, Prep
+from .scorelib.constants import Score, Prep, MAX_DELEGATIONS, MAX_ITERATION_LOOP
 from .scorelib.linked_list import LinkedListDB
 from .scorelib.reward_handler import RewardHandler
 
-from .utils.utils import iscore_to_loop, floor, compute_rscore_reward_rate
+from .utils.codec import PayoutCodec
+from .utils.utils import iscore_to_loop, floor, compute_rscore_reward_rate, split_by_weights
 from .utils.checks import only_admin, only_owner, only_review_contract
 
 
 TAG = 'Staking'
 
+# Version of the storage layout, bumped whenever a migration step is added.
+VERSION = 2
+
 
 class Staking(IconScoreBase):
 
@@ -22,10 +26,32 @@ class Staking(IconScoreBase):
         self._total_loop_reviews = VarDB("total_loop_reviews", db, int)
         self._loop_per_address = DictDB("staked_loop", db, int)
         self._rewards_tracker = RewardHandler("staking", db, self)
-        self._payout_queue = LinkedListDB("icx_payout", db, str)
+        self._payout_queue = LinkedListDB("icx_payout", db, bytes, codec=PayoutCodec, packed=True)
+
+        # Withdrawn funds waiting to be claimed by their owner.
+        self._claimable_payouts = DictDB("claimable_payouts", db, int)
+        self._total_claimable_payouts = VarDB("total_claimable_payouts", db, int)
+
+        # Stake changes waiting to be applied by the next rebalance.
+        self._pending_stake_delta = VarDB("pending_stake_delta", db, int)
+        self._rebalance_threshold = VarDB("rebalance_threshold", db, int)
+
+        # Mirror of the stake and delegation this contract has set on the system score.
+        self._total_staked = VarDB("total_staked", db, int)
+        self._total_delegated = VarDB("total_delegated", db, int)
 
         self._prep_vote = VarDB("prep_vote", db, Address)
+
+        # P-Reps to delegate to and their weights, as configured by the admin.
+        self._delegation_preps = ArrayDB("delegation_preps", db, Address)
+        self._delegation_weights = ArrayDB("delegation_weights", db, int)
+
+        # Configured P-Reps that are part of the current term, refreshed once per term.
+        self._term_preps = ArrayDB("term_preps", db, Address)
+        self._term_weights = ArrayDB("term_weights", db, int)
+        self._term_end_block = VarDB("term_end_block", db, int)
         self._admin = VarDB("admin", db, Address)
+        self._version = VarDB("version", db, int)
 
         # Score addresses.
         self._review_score = VarDB("review_score", db, Address)
@@ -34,10 +60,13 @@ class Staking(IconScoreBase):
     def on_install(self) -> None:
         super().on_install()
         self._prep_vote.set(Prep.geonode)
+        self._version.set(VERSION)
         self._admin.set(Address.from_string("hxf3ebaeabffbf6c3413f2ff0046ca40105bb8ac3f"))
 
     def on_update(self) -> None:
         super().on_update()
+        self._migrate()
+        self._reconcile()
 
     @external
     @only_owner
@@ -68,32 +97,179 @@ class Staking(IconScoreBase):
     @external
     @only_review_contract
     def withdraw_funds(self, reviewer: Address, amount: int) -> None:
-        self._rewards_tracker.update_rewards(reviewer, self._loop_per_address[reviewer])
-        self._total_loop_reviews.set(self._total_loop_reviews.get() - amount)
-        self._loop_per_address[reviewer] -= amount
-        payout_amount = amount + self._rewards_tracker.claim_rewards(reviewer, amount)
+        payout_amount = self._withdraw(reviewer, amount)
         self._decrement_funds(payout_amount)
-        self._payout_queue.append(json_dumps({'address': str(reviewer), 'amount': payout_amount}))
+        self._credit_payout(reviewer, payout_amount)
 
     @external
-    def payout_funds(self) -> None: 
-        unlocked_funds = self.icx.get_balance(self.address)       
-        
-        node_ids_traversed = []
-        for entry in self._payout_queue:
-            data = json_loads(entry[1])
-            id = entry[0]
-
-            if data['amount'] <= unlocked_funds:
-                self.icx.transfer(Address.from_string(data['address']), data['amount'])
-                node_ids_traversed.append(id)
-                unlocked_funds -= data['amount']
-            else:
+    @only_review_contract
+    def withdraw_funds_batch(self, reviewers: List[Address], amounts: List[int]) -> None:
+        """
+        Withdraw the funds of several reviewers at once, amounts being totals per reviewer.
+        Stake and delegation are only updated once for the whole batch.
+        """
+        if len(reviewers) != len(amounts):
+            revert('Reviewers and amounts must have the same length.')
+
+        payouts = []
+        for reviewer, amount in zip(reviewers, amounts):
+            payouts.append((reviewer, self._withdraw(reviewer, amount)))
+
+        self._decrement_funds(sum(payout_amount for _, payout_amount in payouts))
+        for reviewer, payout_amount in payouts:
+            self._credit_payout(reviewer, payout_amount)
+
+    @external
+    def claim_payout(self) -> None:
+        """
+        Transfer the withdrawn funds of the sender, once they have been unlocked.
+        """
+        sender = self.msg.sender
+        amount = self._claimable_payouts[sender]
+
+        if not amount:
+            revert('There is no payout to claim.')
+        if amount > self.icx.get_balance(self.address):
+            revert('Funds are not unlocked yet.')
+
+        self._claimable_payouts.remove(sender)
+        self._total_claimable_payouts.set(self._total_claimable_payouts.get() - amount)
+        self.icx.transfer(sender, amount)
+        self.PayoutClaimed(sender, amount)
+
+    @external(readonly=True)
+    def get_claimable_payout(self, address: Address) -> int:
+        return self._claimable_payouts[address]
+
+    @external(readonly=True)
+    def get_total_claimable_payouts(self) -> int:
+        return self._total_claimable_payouts.get()
+
+    @external
+    def payout_funds(self, max_entries: int = MAX_ITERATION_LOOP) -> None:
+        """
+        Pay out at most `max_entries` entries of the payout queue, in order, as long as the
+        unlocked funds cover them. Emits the number of processed entries so keepers can loop.
+        Withdrawals are now credited to the claimable payouts, the queue only holds the
+        entries that were queued before.
+        """
+        if max_entries <= 0:
+            revert('Max entries must be larger than zero.')
+
+        unlocked_funds = self.icx.get_balance(self.address)
+
+        payouts = []
+        next_id = 0
+        for id, (address, amount) in self._payout_queue.iter_from(0, max_entries + 1):
+            if len(payouts) == max_entries or amount > unlocked_funds:
+                next_id = id
                 break
-        
-        # Delete all successful payouts
-        for id in node_ids_traversed:
-            self._payout_queue.remove(id)
+            payouts.append((address, amount))
+            unlocked_funds -= amount
+
+        # Delete all the payouts at once, before any funds leave the contract.
+        if next_id:
+            self._payout_queue.truncate_before(next_id)
+        elif payouts:
+            self._payout_queue.clear()
+
+        paid_amount = 0
+        for address, amount in payouts:
+            self.icx.transfer(address, amount)
+            paid_amount += amount
+
+        self.PayoutProcessed(len(payouts), paid_amount)
+
+    @external
+    def rebalance(self) -> None:
+        """
+        Apply the pending stake delta to the stake and delegation of this contract.
+        The admin can rebalance at any time, anyone else once the delta reaches the threshold.
+        """
+        delta = self._pending_stake_delta.get()
+        if self.msg.sender != self._admin.get() and abs(delta) < self._rebalance_threshold.get():
+            revert('Pending stake delta is below the rebalance threshold.')
+        if not delta:
+            return
+
+        self._pending_stake_delta.set(0)
+        new_amount = self._total_delegated.get() + delta
+        if delta > 0:
+            self._system_score.setStake(new_amount)
+            self._system_score.setDelegation(self._create_delegation(new_amount))
+        else:
+            self._system_score.setDelegation(self._create_delegation(new_amount))
+            self._system_score.setStake(new_amount)
+        self._total_staked.set(new_amount)
+        self._total_delegated.set(new_amount)
+
+    @external
+    @only_admin
+    def reconcile(self) -> None:
+        """
+        Overwrite the mirrored stake and delegation with the values of the system score.
+        """
+        self._reconcile()
+
+    @external(readonly=True)
+    def get_mirror_drift(self) -> dict:
+        """
+        Returns how much the stake and delegation on the system score differ from the mirror.
+        """
+        stake, delegation = self._query_system_totals()
+        return {
+            'stake': stake - self._total_staked.get(),
+            'delegation': delegation - self._total_delegated.get()
+        }
+
+    @external
+    @only_admin
+    def set_rebalance_threshold(self, threshold: int) -> None:
+        self._rebalance_threshold.set(threshold)
+
+    @external(readonly=True)
+    def get_rebalance_threshold(self) -> int:
+        return self._rebalance_threshold.get()
+
+    @external
+    @only_admin
+    def set_delegation_preps(self, preps: List[Address], weights: List[int]) -> None:
+        """
+        Spread the delegation of this contract over several P-Reps, proportionally to their weights.
+        P-Reps that are not part of the current term are skipped, if none is, the delegation goes to
+        the default P-Rep. The current delegation is redistributed right away.
+        """
+        if len(preps) != len(weights):
+            revert('P-Reps and weights must have the same length.')
+        if len(preps) > MAX_DELEGATIONS:
+            revert(f'Can not delegate to more than {MAX_DELEGATIONS} P-Reps.')
+        if len(set(preps)) != len(preps):
+            revert('P-Reps must be unique.')
+        for weight in weights:
+            if weight <= 0:
+                revert('Weights must be larger than zero.')
+
+        while self._delegation_preps:
+            self._delegation_preps.pop()
+            self._delegation_weights.pop()
+        for prep, weight in zip(preps, weights):
+            self._delegation_preps.put(prep)
+            self._delegation_weights.put(weight)
+
+        # Force a refresh of the term P-Reps.
+        self._term_end_block.set(0)
+        self._system_score.setDelegation(self._create_delegation(self._total_delegated.get()))
+
+    @external(readonly=True)
+    def get_delegation_preps(self) -> dict:
+        preps = {}
+        for prep, weight in zip(self._delegation_preps, self._delegation_weights):
+            preps[str(prep)] = weight
+        return preps
+
+    @external(readonly=True)
+    def get_pending_stake_delta(self) -> int:
+        return self._pending_stake_delta.get()
 
     @external(readonly=True)
     def query_staking_rewards(self, address: Address) -> int:
@@ -128,9 +304,8 @@ class Staking(IconScoreBase):
     @external(readonly=True)
     def dipsplay_payout_queue(self) -> list:
         queue = []
-        for entry in self._payout_queue:
-            entry = json_loads(entry[1])
-            queue.append(entry)
+        for _, (address, amount) in self._payout_queue:
+            queue.append({'address': str(address), 'amount': amount})
         return queue
 
     @external(readonly=True)
@@ -139,34 +314,125 @@ class Staking(IconScoreBase):
 
     @external(readonly=True)
     def get_total_delegated(self) -> int:
-        return self._system_score.getDelegation(self.address)['totalDelegated']
+        return self._total_delegated.get()
 
     @external(readonly=True)
     def get_total_staked(self) -> int:
-        return self._system_score.getStake(self.address)['stake']
+        return self._total_staked.get()
+
+    # ================================================================================================
+    # Eventlogs
+    # ================================================================================================
+
+    @eventlog(indexed=1)
+    def PayoutClaimed(self, address: Address, amount: int):
+        pass
+
+    @eventlog
+    def PayoutProcessed(self, entries: int, amount: int):
+        pass
+
+    @eventlog
+    def Reconciled(self, stake_drift: int, delegation_drift: int):
+        pass
 
     # ================================================================================================
     # Internal methods
     # ================================================================================================
 
+    def _withdraw(self, reviewer: Address, amount: int) -> int:
+        """
+        Release the funds of a reviewer and claim their rewards. Returns the amount to pay out.
+        """
+        if amount < 0:
+            revert('Withdrawn amount can not be negative.')
+        if amount > self._loop_per_address[reviewer]:
+            revert('Withdrawn amount exceeds the deposited funds.')
+
+        self._rewards_tracker.update_rewards(reviewer, self._loop_per_address[reviewer])
+        self._total_loop_reviews.set(self._total_loop_reviews.get() - amount)
+        self._loop_per_address[reviewer] -= amount
+
+        # Claiming reverts when no rewards have accrued, which must not block the withdrawal.
+        if not self._rewards_tracker.query_rewards(reviewer, amount):
+            return amount
+        return amount + self._rewards_tracker.claim_rewards(reviewer, amount)
+
+    def _credit_payout(self, address: Address, amount: int) -> None:
+        self._claimable_payouts[address] += amount
+        self._total_claimable_payouts.set(self._total_claimable_payouts.get() + amount)
+
     def _increment_funds(self, amount: int) -> None:
-        new_amount = self._system_score.getDelegation(self.address)['totalDelegated'] + amount
-        self._system_score.setStake(new_amount)
-        self._system_score.setDelegation(self._create_delegation(new_amount))
+        # Staked by the next rebalance.
+        self._pending_stake_delta.set(self._pending_stake_delta.get() + amount)
 
     def _decrement_funds(self, amount: int) -> None:
-        new_amount = self._system_score.getDelegation(self.address)['totalDelegated'] - amount
-        self._system_score.setDelegation(self._create_delegation(new_amount))
-        self._system_score.setStake(new_amount)
+        # Unstaked by the next rebalance.
+        self._pending_stake_delta.set(self._pending_stake_delta.get() - amount)
+
+    def _migrate(self) -> None:
+        version = self._version.get()
+
+        if version < 1:
+            # Payout queue entries used to be json strings.
+            legacy_queue = LinkedListDB("icx_payout", self.db, str)
+            unpacked_queue = LinkedListDB("icx_payout", self.db, bytes, codec=PayoutCodec)
+            for id, entry in legacy_queue:
+                data = json_loads(entry)
+                unpacked_queue.set_node_value(id, (Address.from_string(data['address']), data['amount']))
+
+        if version < 2:
+            # Payout queue nodes used to be stored as one VarDB per field.
+            self._payout_queue.pack_nodes()
+
+        self._version.set(VERSION)
+
+    def _query_system_totals(self) -> tuple:
+        stake = self._system_score.getStake(self.address)['stake']
+        delegation = self._system_score.getDelegation(self.address)['totalDelegated']
+        return stake, delegation
+
+    def _reconcile(self) -> None:
+        stake, delegation = self._query_system_totals()
+        self.Reconciled(stake - self._total_staked.get(), delegation - self._total_delegated.get())
+        self._total_staked.set(stake)
+        self._total_delegated.set(delegation)
 
     def _create_delegation(self, value: int) -> list:
+        self._refresh_term_preps()
+
+        preps = list(self._term_preps)
+        weights = list(self._term_weights)
+        if not preps:
+            preps = [self._prep_vote.get()]
+            weights = [1]
+
         delegations = []
-        delegation = {
-            'address': Prep.geonode,
-            'value': value
-        }
-        delegations.append(delegation)
+        for prep, amount in zip(preps, split_by_weights(value, weights)):
+            delegation = {
+                'address': prep,
+                'value': amount
+            }
+            delegations.append(delegation)
         return delegations
+
+    def _refresh_term_preps(self) -> None:
+        # The P-Reps of a term can't change before the term ends.
+        if self.block_height <= self._term_end_block.get():
+            return
+
+        term = self._system_score.getPRepTerm()
+        term_preps = set(str(prep['address']) for prep in term['preps'])
+
+        while self._term_preps:
+            self._term_preps.pop()
+            self._term_weights.pop()
+        for prep, weight in zip(self._delegation_preps, self._delegation_weights):
+            if str(prep) in term_preps:
+                self._term_preps.put(prep)
+                self._term_weights.put(weight)
+
+        self._term_end_block.set(term['endBlockHeight'])
     
     def _only_review_contract(self) -> None:
         if not self.msg.sender == self._review_score.get():
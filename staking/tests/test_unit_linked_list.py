@@ -0,0 +1,117 @@
+from ..staking import Staking
+from ..scorelib.linked_list import LinkedListDB, InvalidLimit, LinkedNodeInvalidValueType
+from tbears.libs.scoretest.score_test_case import ScoreTestCase
+
+VALUES = [b'a', b'b', b'c', b'd', b'e']
+
+
+class TestLinkedListDB(ScoreTestCase):
+
+    PACKED = False
+
+    def setUp(self):
+        super().setUp()
+        self.score = self.get_score_instance(Staking, self.test_account1)
+        self.list = self.create_list()
+
+    def create_list(self) -> LinkedListDB:
+        return LinkedListDB("test", self.score.db, bytes, packed=self.PACKED)
+
+    def assert_list(self, values: list):
+        # Checks the values, length, head, tail and links in both directions.
+        nodes = list(self.list)
+        self.assertEqual([value for _, value in nodes], values)
+        self.assertEqual(len(self.list), len(values))
+        if not values:
+            self.assertEqual(self.list._head_id.get(), 0)
+            self.assertEqual(self.list._tail_id.get(), 0)
+            return
+
+        ids = [node_id for node_id, _ in nodes]
+        self.assertEqual(self.list._head_id.get(), ids[0])
+        self.assertEqual(self.list._tail_id.get(), ids[-1])
+        with self.assertRaises(StopIteration):
+            self.list.prev(ids[0])
+        with self.assertRaises(StopIteration):
+            self.list.next(ids[-1])
+        for prev_id, next_id in zip(ids, ids[1:]):
+            self.assertEqual(self.list.next(prev_id), next_id)
+            self.assertEqual(self.list.prev(next_id), prev_id)
+
+    def test_extend_empty_list(self):
+        node_ids = self.list.extend(VALUES)
+        self.assertEqual([node_id for node_id, _ in self.list], node_ids)
+        self.assert_list(VALUES)
+
+    def test_extend_after_tail(self):
+        self.list.append(b'x')
+        self.list.extend(VALUES[:2])
+        self.list.append(b'y')
+        self.assert_list([b'x'] + VALUES[:2] + [b'y'])
+
+    def test_extend_nothing(self):
+        self.assertEqual(self.list.extend([]), [])
+        self.assert_list([])
+
+    def test_pop_head(self):
+        self.list.extend(VALUES)
+        self.assertEqual(self.list.pop_head(2), VALUES[:2])
+        self.assert_list(VALUES[2:])
+
+        self.assertEqual(self.list.pop_head(0), [])
+        self.assert_list(VALUES[2:])
+
+    def test_pop_head_whole_list(self):
+        self.list.extend(VALUES)
+        self.assertEqual(self.list.pop_head(10), VALUES)
+        self.assert_list([])
+
+        self.list.append(b'x')
+        self.assert_list([b'x'])
+
+    def test_truncate_before(self):
+        node_ids = self.list.extend(VALUES)
+        self.assertEqual(self.list.truncate_before(node_ids[0]), 0)
+        self.assert_list(VALUES)
+
+        self.assertEqual(self.list.truncate_before(node_ids[3]), 3)
+        self.assert_list(VALUES[3:])
+
+        self.assertEqual(self.list.truncate_before(node_ids[4]), 1)
+        self.assert_list(VALUES[4:])
+
+    def test_select_from(self):
+        node_ids = self.list.extend(VALUES)
+        self.assertEqual(self.list.select_from(0, 2), (list(zip(node_ids[:2], VALUES[:2])), node_ids[2]))
+        self.assertEqual(self.list.select_from(node_ids[2], 2), (list(zip(node_ids[2:4], VALUES[2:4])), node_ids[4]))
+        self.assertEqual(self.list.select_from(node_ids[4], 2), ([(node_ids[4], VALUES[4])], -1))
+
+        for limit in (0, -1):
+            with self.assertRaises(InvalidLimit):
+                self.list.select_from(0, limit)
+
+
+class TestPackedLinkedListDB(TestLinkedListDB):
+
+    PACKED = True
+
+    def test_packed_value_type(self):
+        for value_type in (str, int):
+            with self.assertRaises(LinkedNodeInvalidValueType):
+                LinkedListDB("test", self.score.db, value_type, packed=True)
+
+    def test_pack_nodes(self):
+        legacy = LinkedListDB("test", self.score.db, bytes)
+        node_ids = legacy.extend(VALUES)
+        legacy.remove(node_ids[1])
+        node_ids.append(legacy.prepend(b"f"))
+        nodes = list(legacy)
+
+        self.list.pack_nodes()
+        self.assertEqual(list(self.create_list()), nodes)
+        self.assert_list([value for _, value in nodes])
+        for node_id in node_ids:
+            self.assertFalse(legacy._node(node_id).exists())
+
+        self.list.append(b'x')
+        self.assert_list([value for _, value in nodes] + [b'x'])
@@ -1,7 +1,9 @@
+from unittest.mock import MagicMock
+
 from ..staking import Staking
-from ..scorelib.constants import Score
+from ..scorelib.constants import Score, Prep
 from tbears.libs.scoretest.score_test_case import ScoreTestCase
-from iconservice import Address
+from iconservice import Address, IconScoreException
 
 
 class TestStaking(ScoreTestCase):
@@ -20,3 +22,225 @@ class TestStaking(ScoreTestCase):
     #
     #    self.score._increment_funds(30)
     #    self.assertEqual(self.score._total_delegation.get(), 70)
+
+    def mock_system_score(self, term_preps: list = (), term_end_block: int = 10**9) -> MagicMock:
+        system_score = MagicMock()
+        system_score.getPRepTerm.return_value = {
+            'preps': [{'address': prep} for prep in term_preps],
+            'endBlockHeight': term_end_block
+        }
+        self.score._system_score = system_score
+        return system_score
+
+    def deposit(self, amount: int):
+        self.score._review_score.set(self.test_account2)
+        self.set_msg(self.test_account2)
+        self.score.deposit_funds(self.test_account2, amount)
+
+    def distribute_icx(self, amount: int):
+        self.score._admin.set(self.test_account1)
+        self.set_msg(self.test_account1, amount)
+        self.score.distribute_icx()
+
+    def test_withdraw_funds_exceeding_deposit(self):
+        self.score._review_score.set(self.test_account2)
+        self.set_msg(self.test_account2)
+        self.score.deposit_funds(self.test_account1, 100)
+        self.distribute_icx(10**18)
+        self.set_msg(self.test_account2)
+
+        with self.assertRaisesRegex(IconScoreException, 'exceeds'):
+            self.score.withdraw_funds_batch([self.test_account1], [200])
+
+        self.score.withdraw_funds_batch([self.test_account1], [60])
+        self.assertEqual(self.score.get_claimable_payout(self.test_account1), 60 + 10**18)
+
+        self.distribute_icx(10**18)
+        self.set_msg(self.test_account2)
+        with self.assertRaisesRegex(IconScoreException, 'exceeds'):
+            self.score.withdraw_funds_batch([self.test_account1, self.test_account1], [30, 30])
+
+    def test_withdraw_funds_batch_without_rewards(self):
+        self.score._review_score.set(self.test_account2)
+        self.set_msg(self.test_account2)
+        self.score.deposit_funds(self.test_account1, 100)
+        self.distribute_icx(10**18)
+
+        # Deposited after the distribution, so no rewards have accrued.
+        self.set_msg(self.test_account2)
+        self.score.deposit_funds(self.test_account2, 50)
+        self.score.withdraw_funds_batch([self.test_account1, self.test_account2], [100, 50])
+
+        self.assertEqual(self.score.get_claimable_payout(self.test_account1), 100 + 10**18)
+        self.assertEqual(self.score.get_claimable_payout(self.test_account2), 50)
+        self.assertEqual(self.score.get_pending_stake_delta(), -10**18)
+
+    def test_payout_funds(self):
+        queue = self.score._payout_queue
+        for amount in (10, 20, 30, 40):
+            queue.append((self.test_account2, amount))
+        self.initialize_accounts({self.score.address: 50})
+        balance = self.get_balance(self.test_account2)
+
+        # Only max_entries entries are paid out.
+        self.score.payout_funds(1)
+        self.assertEqual(len(queue), 3)
+        self.assertEqual(queue.head_value(), (self.test_account2, 20))
+
+        # Entries are paid out in order while the unlocked funds cover them.
+        self.score.payout_funds(10)
+        self.assertEqual(len(queue), 2)
+        self.assertEqual(queue.head_value(), (self.test_account2, 30))
+        self.assertEqual(self.get_balance(self.test_account2), balance + 30)
+
+        self.initialize_accounts({self.score.address: 70})
+        self.score.payout_funds(10)
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(list(queue), [])
+        self.assertEqual(self.get_balance(self.test_account2), balance + 100)
+
+    def test_claim_payout(self):
+        self.score._credit_payout(self.test_account2, 30)
+        self.assertEqual(self.score.get_total_claimable_payouts(), 30)
+        self.set_msg(self.test_account2)
+
+        with self.assertRaisesRegex(IconScoreException, 'not unlocked'):
+            self.score.claim_payout()
+
+        self.initialize_accounts({self.score.address: 30})
+        balance = self.get_balance(self.test_account2)
+        self.score.claim_payout()
+        self.assertEqual(self.get_balance(self.test_account2), balance + 30)
+        self.assertEqual(self.score.get_claimable_payout(self.test_account2), 0)
+        self.assertEqual(self.score.get_total_claimable_payouts(), 0)
+
+        with self.assertRaisesRegex(IconScoreException, 'no payout'):
+            self.score.claim_payout()
+
+    def test_rebalance_threshold(self):
+        system_score = self.mock_system_score()
+        self.set_msg(self.test_account1)
+        self.score.set_admin(self.test_account1)
+        self.score.set_rebalance_threshold(100)
+        self.deposit(60)
+
+        # Anyone can rebalance once the delta reaches the threshold, the admin at any time.
+        with self.assertRaisesRegex(IconScoreException, 'threshold'):
+            self.score.rebalance()
+        system_score.setStake.assert_not_called()
+
+        self.set_msg(self.test_account1)
+        self.score.rebalance()
+        self.assertEqual(self.score.get_pending_stake_delta(), 0)
+
+        self.deposit(100)
+        self.score.rebalance()
+        self.assertEqual(self.score.get_pending_stake_delta(), 0)
+        self.assertEqual(self.score.get_total_staked(), 160)
+        self.assertEqual(self.score.get_total_delegated(), 160)
+
+    def test_rebalance_order(self):
+        system_score = self.mock_system_score()
+        self.set_msg(self.test_account1)
+        self.score.set_admin(self.test_account1)
+        delegation = [{'address': Prep.geonode, 'value': 100}]
+
+        # The stake is raised before delegating it.
+        self.score._increment_funds(100)
+        self.score.rebalance()
+        self.assertEqual(
+            [call for call in system_score.method_calls if call[0] != 'getPRepTerm'],
+            [('setStake', (100,), {}), ('setDelegation', (delegation,), {})]
+        )
+
+        # The delegation is lowered before unstaking.
+        system_score.reset_mock()
+        self.score._decrement_funds(60)
+        self.score.rebalance()
+        delegation = [{'address': Prep.geonode, 'value': 40}]
+        self.assertEqual(
+            [call for call in system_score.method_calls if call[0] != 'getPRepTerm'],
+            [('setDelegation', (delegation,), {}), ('setStake', (40,), {})]
+        )
+        self.assertEqual(self.score.get_pending_stake_delta(), 0)
+        self.assertEqual(self.score.get_total_staked(), 40)
+
+        # Nothing to apply.
+        system_score.reset_mock()
+        self.score.rebalance()
+        system_score.setStake.assert_not_called()
+        system_score.setDelegation.assert_not_called()
+
+    def test_reconcile(self):
+        system_score = self.mock_system_score()
+        system_score.getStake.return_value = {'stake': 120}
+        system_score.getDelegation.return_value = {'totalDelegated': 110}
+        self.set_msg(self.test_account1)
+        self.score.set_admin(self.test_account1)
+        self.score._increment_funds(100)
+        self.score.rebalance()
+
+        self.assertEqual(self.score.get_mirror_drift(), {'stake': 20, 'delegation': 10})
+
+        self.set_msg(self.test_account2)
+        with self.assertRaises(IconScoreException):
+            self.score.reconcile()
+
+        self.set_msg(self.test_account1)
+        self.score.reconcile()
+        self.assertEqual(self.score.get_total_staked(), 120)
+        self.assertEqual(self.score.get_total_delegated(), 110)
+        self.assertEqual(self.score.get_mirror_drift(), {'stake': 0, 'delegation': 0})
+
+    def test_set_delegation_preps(self):
+        preps = [Address.from_string(f"hx{index:040x}") for index in range(1, 4)]
+        system_score = self.mock_system_score(term_preps=[preps[0], preps[2]], term_end_block=100)
+        self.set_msg(self.test_account1)
+        self.score.set_admin(self.test_account1)
+        self.set_block(10)
+        self.score._increment_funds(100)
+        self.score.rebalance()
+
+        # P-Reps that are not part of the term are skipped.
+        system_score.reset_mock()
+        self.score.set_delegation_preps(preps, [1, 1, 2])
+        system_score.setDelegation.assert_called_once_with(
+            [{'address': preps[0], 'value': 33}, {'address': preps[2], 'value': 67}]
+        )
+        self.assertEqual(self.score.get_delegation_preps(), {str(prep): weight for prep, weight in zip(preps, [1, 1, 2])})
+
+        # The term P-Reps are not queried again before the end of the term.
+        system_score.getPRepTerm.return_value = {'preps': [{'address': prep} for prep in preps], 'endBlockHeight': 200}
+        self.set_block(100)
+        self.score._increment_funds(20)
+        self.score.rebalance()
+        system_score.getPRepTerm.assert_called_once()
+        system_score.setDelegation.assert_called_with(
+            [{'address': preps[0], 'value': 40}, {'address': preps[2], 'value': 80}]
+        )
+
+        self.set_block(101)
+        self.score._increment_funds(1)
+        self.score.rebalance()
+        self.assertEqual(system_score.getPRepTerm.call_count, 2)
+        system_score.setDelegation.assert_called_with(
+            [{'address': preps[0], 'value': 30}, {'address': preps[1], 'value': 30}, {'address': preps[2], 'value': 61}]
+        )
+
+    def test_delegation_fallback(self):
+        # None of the configured P-Reps is part of the term.
+        prep = Address.from_string(f"hx{1:040x}")
+        system_score = self.mock_system_score(term_preps=[], term_end_block=100)
+        self.set_msg(self.test_account1)
+        self.score.set_admin(self.test_account1)
+        self.score.set_delegation_preps([prep], [1])
+        system_score.setDelegation.assert_called_once_with([{'address': Prep.geonode, 'value': 0}])
+
+    def test_set_delegation_preps_validation(self):
+        preps = [Address.from_string(f"hx{index:040x}") for index in range(1, 3)]
+        self.mock_system_score()
+        self.set_msg(self.test_account1)
+        self.score.set_admin(self.test_account1)
+        for args in ((preps, [1]), ([preps[0], preps[0]], [1, 1]), (preps, [1, 0])):
+            with self.assertRaises(IconScoreException):
+                self.score.set_delegation_preps(*args)
@@ -0,0 +1,29 @@
+import unittest
+
+from ..utils.utils import split_by_weights
+
+
+class TestSplitByWeights(unittest.TestCase):
+
+    def test_exact_split(self):
+        self.assertEqual(split_by_weights(100, [1, 3]), [25, 75])
+        self.assertEqual(split_by_weights(7, [5]), [7])
+        self.assertEqual(split_by_weights(0, [1, 2]), [0, 0])
+
+    def test_largest_remainders(self):
+        # 100 / 3 = 33.33 and 200 / 3 = 66.67, the unit left goes to the largest remainder.
+        self.assertEqual(split_by_weights(100, [1, 2]), [33, 67])
+        self.assertEqual(split_by_weights(10, [1, 1, 1]), [4, 3, 3])
+        self.assertEqual(split_by_weights(5, [3, 3, 4]), [2, 1, 2])
+
+    def test_equal_remainders(self):
+        # Ties go to the first parts.
+        self.assertEqual(split_by_weights(2, [1, 1, 1]), [1, 1, 0])
+
+    def test_parts_add_up(self):
+        for amount in (1, 99, 10**18 + 7, 123_456_789_012_345_678_901):
+            for weights in ([1], [1, 1], [7, 11, 13], [10**9, 1, 3, 5]):
+                parts = split_by_weights(amount, weights)
+                self.assertEqual(sum(parts), amount)
+                for part, weight in zip(parts, weights):
+                    self.assertLessEqual(abs(part * sum(weights) - amount * weight), sum(weights))
@@ -0,0 +1,20 @@
+from iconservice import Address
+
+
+class PayoutCodec:
+        # Fixed layout encoding of a payout queue entry:
+        #   address  21 bytes  address prefix followed by the address body
+        #   amount   n bytes   unsigned big endian integer, the rest of the entry
+
+        ADDRESS_SIZE = 21
+
+        @staticmethod
+        def encode(payout: tuple) -> bytes:
+                address, amount = payout
+                return address.to_bytes_including_prefix() + amount.to_bytes((amount.bit_length() + 7) // 8, 'big')
+
+        @staticmethod
+        def decode(data: bytes) -> tuple:
+                address = Address.from_bytes_including_prefix(data[:PayoutCodec.ADDRESS_SIZE])
+                amount = int.from_bytes(data[PayoutCodec.ADDRESS_SIZE:], 'big')
+                return address, amount
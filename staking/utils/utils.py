@@ -17,4 +17,16 @@ def rscore_to_loop(rscore: int) -> int:
 
 
 def compute_rscore_reward_rate(distribution_amount: int, total_review_lockup: int) -> int:
-        return loop_to_rscore(distribution_amount) // total_review_lockup
\ No newline at end of file
+        return loop_to_rscore(distribution_amount) // total_review_lockup
+
+
+def split_by_weights(amount: int, weights: list) -> list:
+        # Split an amount proportionally to the weights. The parts always add up to the amount,
+        # the remainder of the rounding goes to the parts with the largest fractional remainders.
+        total_weight = sum(weights)
+        parts = [amount * weight // total_weight for weight in weights]
+        remainders = [amount * weight % total_weight for weight in weights]
+        order = sorted(range(len(weights)), key=lambda i: remainders[i], reverse=True)
+        for i in order[:amount - sum(parts)]:
+                parts[i] += 1
+        return parts
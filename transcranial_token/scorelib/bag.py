@@ -12,6 +12,11 @@ class BagDBIsNotOrdered(Exception):
     pass
 
 
+class InvalidLimit(Exception):
+    # The number of items to select should be larger than zero
+    pass
+
+
 class BagDB(object):
     # BagDB is an iterable collection of items that may have duplicates.
     # Order of retrieval is *optionally* significant (*not* significant by default)
@@ -134,4 +139,28 @@ class BagDB(object):
                 # End of array : stop here
                 break
 
-        return result
\ No newline at end of file
+        return result
+
+    def select_from(self, cursor: int = 0, limit: int = 100, cond=None, **kwargs) -> tuple:
+        # Returns the items among the `limit` items starting at index `cursor` that optionally
+        # fulfill a condition, and the cursor to continue from (-1 once the end is reached).
+        # The starting item is directly accessed by its index, so deep pages cost O(limit).
+        if limit <= 0:
+            raise InvalidLimit(self._name, limit)
+
+        result = []
+        if cursor < 0:
+            return result, -1
+
+        length = len(self._items)
+        end = min(cursor + limit, length)
+        for index in range(cursor, end):
+            item = self._items[index]
+            if cond:
+                if cond(self._db, item, **kwargs):
+                    result.append(item)
+            else:
+                result.append(item)
+
+        next_cursor = end if end < length else -1
+        return result, next_cursor
\ No newline at end of file
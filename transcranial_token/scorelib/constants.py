@@ -0,0 +1,5 @@
+# Maximum number of recipients of a single batch operation.
+MAX_BATCH_SIZE = 500
+
+# Maximum number of holders returned by a single page.
+MAX_PAGE_SIZE = 100
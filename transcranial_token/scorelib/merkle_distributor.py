@@ -0,0 +1,106 @@
+from iconservice import *
+
+
+class MerkleDistributor:
+    """
+    Tracks claims against a Merkle root of (index, address, amount) leaves, so a distribution only costs
+    on-chain work for the addresses that actually claim. Setting a new root starts a new distribution
+    with an empty claimed bitmap.
+
+    Leaves and nodes are hashed with sha3_256:
+    leaf  :  sha3_256(index as 32 bytes big endian + address with its prefix byte + amount as 32 bytes big endian)
+    node  :  sha3_256(smallest child + largest child)
+    """
+
+    # Number of claimed flags packed in a single storage word.
+    WORD_SIZE = 256
+
+    # Index and amount of a leaf are encoded on 32 bytes.
+    MAX_LEAF_VALUE = 2**256 - 1
+
+    def __init__(self, name: str, db: IconScoreDatabase):
+        """
+        Initialization
+
+        Parameters:
+        name  :  Name to differentiate between databases if several distributors are used in the same contract.
+        db    :  Database instance used to store persistent data.
+        """
+        self._root = VarDB(f"{name}_merkle_root", db, bytes)
+        self._distribution = VarDB(f"{name}_distribution", db, int)
+        # Claimed flags of the leaves, keyed by distribution and word.
+        self._claimed = DictDB(f"{name}_claimed", db, int)
+
+    def set_root(self, root: bytes) -> int:
+        """
+        Start a new distribution. Returns its identifier.
+
+        Parameters:
+        root  :  Merkle root of the leaves of the distribution.
+        """
+        if len(root) != 32:
+            revert("Merkle root must be 32 bytes long.")
+
+        distribution = self._distribution.get() + 1
+        self._distribution.set(distribution)
+        self._root.set(root)
+        return distribution
+
+    def get_root(self) -> bytes:
+        return self._root.get()
+
+    def get_distribution(self) -> int:
+        return self._distribution.get()
+
+    def is_claimed(self, index: int) -> bool:
+        word, bit = divmod(index, self.WORD_SIZE)
+        return self._claimed[self._word_key(self._distribution.get(), word)] >> bit & 1 == 1
+
+    def claim(self, index: int, address: Address, amount: int, proof: list) -> None:
+        """
+        Verify a leaf of the current distribution and mark it as claimed. Reverts if the proof is
+        invalid or the leaf was already claimed. It's up to the implementer to pay out the amount.
+
+        Parameters:
+        index    :  Index of the leaf.
+        address  :  Address of the leaf, which must be the claimer.
+        amount   :  Amount of the leaf.
+        proof    :  Sibling hashes from the leaf up to the root.
+        """
+        root = self._root.get()
+        if root is None:
+            revert("There is no distribution to claim from.")
+        if index < 0 or amount < 0:
+            revert("Index and amount can't be less than zero.")
+        if index > self.MAX_LEAF_VALUE or amount > self.MAX_LEAF_VALUE:
+            revert("Index and amount must fit in 32 bytes.")
+
+        word, bit = divmod(index, self.WORD_SIZE)
+        key = self._word_key(self._distribution.get(), word)
+        claimed_word = self._claimed[key]
+        if claimed_word >> bit & 1:
+            revert("Already claimed.")
+
+        node = self._leaf_hash(index, address, amount)
+        for sibling in proof:
+            node = self._node_hash(node, sibling)
+        if node != root:
+            revert("Invalid Merkle proof.")
+
+        self._claimed[key] = claimed_word | (1 << bit)
+
+    @staticmethod
+    def _word_key(distribution: int, word: int) -> str:
+        return f"{distribution}_{word}"
+
+    @staticmethod
+    def _leaf_hash(index: int, address: Address, amount: int) -> bytes:
+        return sha3_256(
+            index.to_bytes(32, "big") + address.to_bytes_including_prefix() + amount.to_bytes(32, "big")
+        )
+
+    @staticmethod
+    def _node_hash(left: bytes, right: bytes) -> bytes:
+        if right < left:
+            left, right = right, left
+        return sha3_256(left + right)
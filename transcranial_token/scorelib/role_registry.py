@@ -0,0 +1,46 @@
+from iconservice import DictDB, IconScoreDatabase, Address
+from .set import SetDB
+
+
+class Role:
+    MINTER = 1
+    BURNER = 2
+
+
+class RoleRegistry(object):
+    # RoleRegistry keeps the roles of every address as a bitmask in a single DictDB,
+    # so checking a permission is one storage read regardless of the number of members.
+    # The members of each role are also indexed in a SetDB in order to list them.
+
+    _NAME = '_ROLE_REGISTRY'
+
+    def __init__(self, var_key: str, db: IconScoreDatabase):
+        self._name = var_key + RoleRegistry._NAME
+        self._roles = DictDB(f'{self._name}_roles', db, value_type=int)
+        self._db = db
+
+    def has_role(self, address: Address, role: int) -> bool:
+        return self._roles[address] & role != 0
+
+    def grant(self, address: Address, role: int) -> None:
+        # Granting a role the address already has is a noop.
+        roles = self._roles[address]
+        if roles & role:
+            return
+        self._roles[address] = roles | role
+        self.members(role).add(address)
+
+    def revoke(self, address: Address, role: int) -> None:
+        # Revoking a role the address doesn't have is a noop.
+        roles = self._roles[address]
+        if not roles & role:
+            return
+        roles &= ~role
+        if roles:
+            self._roles[address] = roles
+        else:
+            self._roles.remove(address)
+        self.members(role).remove(address)
+
+    def members(self, role: int) -> SetDB:
+        return SetDB(f'{self._name}_{role}_members', self._db, value_type=Address)
@@ -0,0 +1,67 @@
+from iconservice import ArrayDB, DictDB, IconScoreDatabase
+
+
+class ItemNotFound(Exception):
+    # Cannot find an entry in the collection
+    pass
+
+
+class SetDB(object):
+    # SetDB is an iterable collection of unique items.
+    # Every item is indexed by its slot in the underlying ArrayDB, so membership
+    # checks and removals only cost a constant amount of storage accesses.
+    # Iteration order is the insertion order, except that a removal moves the
+    # last item into the slot of the removed one.
+
+    _NAME = '_SETDB'
+
+    def __init__(self, var_key: str, db: IconScoreDatabase, value_type: type):
+        self._name = var_key + SetDB._NAME
+        self._items = ArrayDB(f'{self._name}_items', db, value_type=value_type)
+        # Maps an item to its slot in the ArrayDB, offset by one.
+        # A value of 0 means that the item isn't in the set.
+        self._index = DictDB(f'{self._name}_index', db, value_type=int)
+        self._db = db
+
+    def __iter__(self):
+        for item in self._items:
+            yield item
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, index: int):
+        return self._items[index]
+
+    def __contains__(self, item) -> bool:
+        return self._index[item] != 0
+
+    def check_exists(self, item) -> None:
+        if not item in self:
+            raise ItemNotFound(self._name, str(item))
+
+    def add(self, item) -> None:
+        # Adds an item in the set. Adding an existing item is a noop.
+        if item in self:
+            return
+        self._items.put(item)
+        self._index[item] = len(self._items)
+
+    def remove(self, item) -> None:
+        # This operation removes a given item from the set.
+        # If the item does not exist, it *does not raise* a KeyError.
+        slot = self._index[item]
+        if not slot:
+            return
+
+        last = self._items.pop()
+        if slot != len(self._items) + 1:
+            # Replace the removed item with the tail of the array
+            self._items[slot - 1] = last
+            self._index[last] = slot
+        self._index.remove(item)
+
+    def clear(self) -> None:
+        # Removes all the items from the set
+        while self._items:
+            self._index.remove(self._items.pop())
@@ -1,5 +1,7 @@
 from ..transcranial_token import TranscranialToken
+from ..scorelib.merkle_distributor import MerkleDistributor
 from tbears.libs.scoretest.score_test_case import ScoreTestCase
+from iconservice import IconScoreException
 
 
 
@@ -36,4 +38,49 @@ class TestTranscranialToken(ScoreTestCase):
         self.test_add_minter()
         self.set_msg(sender = self.test_account1)
         self.score.mint(self.test_account2, 10**18)
-        print(self.score.balanceOf(self.test_account2))
\ No newline at end of file
+        print(self.score.balanceOf(self.test_account2))
+
+    def test_remove_minter(self):
+        self.test_add_minter()
+        self.score.remove_minter(self.test_account1)
+        self.assertEqual(self.score.get_minters(), [])
+
+    def test_transfer_batch(self):
+        self.test_mint()
+        self.set_msg(sender = self.test_account2)
+        self.score.transferBatch([self.test_account1, self.test_account1], [10, 20])
+        self.assertEqual(self.score.balanceOf(self.test_account1), 30)
+        self.assertEqual(self.score.balanceOf(self.test_account2), 10**18 - 30)
+
+    def test_mint_batch(self):
+        self.test_add_minter()
+        self.score.mintBatch([self.test_account1, self.test_account2], [10, 20])
+        self.assertEqual(self.score.balanceOf(self.test_account1), 10)
+        self.assertEqual(self.score.balanceOf(self.test_account2), 20)
+        self.assertEqual(self.score.totalSupply(), 30)
+
+    def test_claim(self):
+        self.score.set_admin(self.test_account1)
+        leaf1 = MerkleDistributor._leaf_hash(0, self.test_account1, 10)
+        leaf2 = MerkleDistributor._leaf_hash(1, self.test_account2, 20)
+        self.score.set_merkle_root(MerkleDistributor._node_hash(leaf1, leaf2))
+
+        self.set_msg(sender = self.test_account2)
+        self.score.claim(1, 20, [leaf1])
+        self.assertEqual(self.score.balanceOf(self.test_account2), 20)
+        self.assertTrue(self.score.is_claimed(1))
+        self.assertFalse(self.score.is_claimed(0))
+
+        for index, amount in ((2**256, 10), (0, 2**256)):
+            with self.assertRaises(IconScoreException):
+                self.score.claim(index, amount, [leaf2])
+
+    def test_holders(self):
+        self.test_mint()
+        self.set_msg(sender = self.test_account2)
+        self.score.transfer(self.test_account2, self.test_account1, 10**18)
+        self.assertEqual(self.score.holder_count(), 1)
+        self.assertEqual(self.score.get_holders(), {
+            "holders": [{"address": self.test_account1, "balance": 10**18}],
+            "next_cursor": -1
+        })
@@ -3,6 +3,10 @@ from iconservice import *
 from .token_standards import IRC2TokenStandard
 from .interfaces.tokenfallback import TokenFallbackInterface
 from .scorelib.bag import BagDB
+from .scorelib.set import SetDB
+from .scorelib.role_registry import RoleRegistry, Role
+from .scorelib.constants import MAX_BATCH_SIZE, MAX_PAGE_SIZE
+from .scorelib.merkle_distributor import MerkleDistributor
 from .utils.checks import only_admin, only_owner, only_burners, only_minters
 
 class TranscranialToken(IconScoreBase, IRC2TokenStandard):
@@ -17,9 +21,14 @@ class TranscranialToken(IconScoreBase, IRC2TokenStandard):
         self._total_supply = VarDB("total_supply", db, value_type=int)
         self._balances = DictDB("balances", db, value_type=int)
 
+        # Addresses holding a non zero balance.
+        self._holders = SetDB("holders", db, value_type=Address)
+
         # Mint and burn permissions.
-        self._minters = BagDB("minters", db, value_type=Address)
-        self._burners = BagDB("burners", db, value_type=Address)
+        self._roles = RoleRegistry("roles", db)
+
+        # Claimable token distributions.
+        self._distributor = MerkleDistributor("token", db)
 
         # Admin address.
         self._admin = VarDB("admin", db, value_type=Address)
@@ -40,12 +49,19 @@ class TranscranialToken(IconScoreBase, IRC2TokenStandard):
         self._symbol.set(_symbol)
         self._decimals.set(_decimals)
         self._total_supply.set(total_supply)
-        self._balances[self.msg.sender] = total_supply
+        self._set_balance(self.msg.sender, total_supply)
 
     def on_update(self) -> None:
         super().on_update()
         self.set_admin(Address.from_string("hxf3ebaeabffbf6c3413f2ff0046ca40105bb8ac3f"))
 
+        # Minters and burners used to be stored in BagDBs.
+        for var_key, role in (("minters", Role.MINTER), ("burners", Role.BURNER)):
+            legacy_members = BagDB(var_key, self.db, value_type=Address)
+            for member in legacy_members:
+                self._roles.grant(member, role)
+            legacy_members.clear()
+
     @external(readonly=True)
     def name(self) -> str:
         return self._name.get()
@@ -78,51 +94,139 @@ class TranscranialToken(IconScoreBase, IRC2TokenStandard):
     @external(readonly=True)
     def get_minters(self) -> list:
         minters = []
-        for minter in self._minters:
+        for minter in self._roles.members(Role.MINTER):
             minters.append(minter)
         return minters
     
     @external
     @only_admin
     def add_minter(self, _minter: Address) -> None:
-        self._minters.add(_minter)
+        self._roles.grant(_minter, Role.MINTER)
 
     @external(readonly=True)
     def get_burners(self) -> list:
         burners = []
-        for burner in self._burners:
+        for burner in self._roles.members(Role.BURNER):
             burners.append(burner)
         return burners
 
     @external
     @only_admin
     def remove_minter(self, _minter: Address) -> None:
-        self._burners.remove(_minter)
+        self._roles.revoke(_minter, Role.MINTER)
 
     @external
     @only_admin
     def add_burner(self, _burner: Address) -> None:
-        self._burners.add(_burner)
+        self._roles.grant(_burner, Role.BURNER)
 
     @external
     @only_admin
     def remove_burner(self, _burner: Address) -> None:
-        self._burners.remove(_burner)
+        self._roles.revoke(_burner, Role.BURNER)
+
+    @external(readonly=True)
+    def get_holders(self, _cursor: int = 0, _limit: int = MAX_PAGE_SIZE) -> dict:
+        """
+        Returns a page of at most `_limit` holders with their balance starting at `_cursor`, and the
+        cursor of the next page (-1 once every holder has been listed). Balance changes can reorder
+        holders, so a snapshot should query every page at the same block height.
+        """
+        if _cursor < 0:
+            revert("Cursor can not be negative.")
+        if not 0 < _limit <= MAX_PAGE_SIZE:
+            revert(f"Limit must be between 1 and {MAX_PAGE_SIZE}.")
+
+        count = len(self._holders)
+        end = min(_cursor + _limit, count)
+        holders = []
+        for index in range(_cursor, end):
+            holder = self._holders[index]
+            holders.append({"address": holder, "balance": self._balances[holder]})
+
+        return {
+            "holders": holders,
+            "next_cursor": end if end < count else -1
+        }
+
+    @external(readonly=True)
+    def holder_count(self) -> int:
+        return len(self._holders)
+
+    @external
+    @only_admin
+    def register_holders(self, _addresses: List[Address]) -> None:
+        """
+        Backfill the holders that received tokens before the holder index existed.
+        Addresses without balance are ignored.
+        """
+        if len(_addresses) > MAX_BATCH_SIZE:
+            revert(f"Can not register more than {MAX_BATCH_SIZE} holders at once.")
+
+        for address in _addresses:
+            if self._balances[address] > 0:
+                self._holders.add(address)
 
     @external
     @only_minters
     def mint(self, _to: Address, _amount: int, _data: bytes = b'None'):
         self._mint(_to, _amount, _data)
+
+    @external
+    @only_minters
+    def mintBatch(self, _recipients: List[Address], _amounts: List[int], _data: bytes = b'None'):
+        """
+        Mint tokens to several recipients at once, at most MAX_BATCH_SIZE per call.
+        The total supply is updated once with the summed amount.
+        """
+        self._mint_batch(_recipients, _amounts, _data)
     
     @external
     @only_burners
     def burn(self, _from: Address, _amount: int, _data: bytes = b'None'):
         self._burn(self.msg.sender, _amount, _data)
 
+    @external
+    @only_admin
+    def set_merkle_root(self, _root: bytes) -> None:
+        """
+        Start a new claimable distribution from the Merkle root of its (index, address, amount) leaves.
+        """
+        distribution = self._distributor.set_root(_root)
+        self.MerkleRootSet(distribution, _root)
+
+    @external(readonly=True)
+    def get_merkle_root(self) -> dict:
+        return {
+            "distribution": self._distributor.get_distribution(),
+            "root": self._distributor.get_root()
+        }
+
+    @external(readonly=True)
+    def is_claimed(self, _index: int) -> bool:
+        return self._distributor.is_claimed(_index)
+
+    @external
+    def claim(self, _index: int, _amount: int, _proof: List[bytes]) -> None:
+        """
+        Claim the tokens of the sender in the current distribution, which are then minted.
+        """
+        self._distributor.claim(_index, self.msg.sender, _amount, _proof)
+        self._mint(self.msg.sender, _amount, b'claim')
+        self.Claimed(_index, self.msg.sender, _amount)
+
     @external
     def transfer(self, _from: Address, _to: Address, _value: int, _data: bytes = b'None'):
         self._transfer(self.msg.sender, _to, _value, _data)
 
+    @external
+    def transferBatch(self, _recipients: List[Address], _values: List[int], _data: bytes = b'None'):
+        """
+        Transfer tokens to several recipients at once, at most MAX_BATCH_SIZE per call.
+        The balance of the sender is checked and debited once for the whole batch.
+        """
+        self._transfer_batch(self.msg.sender, _recipients, _values, _data)
+
     # ================================================================================================
     # Eventlogs
     # ================================================================================================
@@ -139,10 +243,27 @@ class TranscranialToken(IconScoreBase, IRC2TokenStandard):
     def Burn(self, _from: Address, _amount: int, _data: bytes):
         pass
 
+    @eventlog(indexed=1)
+    def MerkleRootSet(self, _distribution: int, _root: bytes):
+        pass
+
+    @eventlog(indexed=2)
+    def Claimed(self, _index: int, _to: Address, _amount: int):
+        pass
+
     # ================================================================================================
     # Internal methods
     # ================================================================================================
     
+    def _set_balance(self, _owner: Address, _balance: int) -> None:
+        self._balances[_owner] = _balance
+
+        # Keeps the holder index in sync on zero/non zero balance transitions.
+        if _balance > 0:
+            self._holders.add(_owner)
+        else:
+            self._holders.remove(_owner)
+
     def _transfer(self, _from: Address, _to: Address, _value: int, _data: bytes):
 
         # Checks the sending value and balance.
@@ -151,8 +272,8 @@ class TranscranialToken(IconScoreBase, IRC2TokenStandard):
         if self._balances[_from] < _value:
             revert("Out of balance.")
 
-        self._balances[_from] -= _value
-        self._balances[_to] += _value
+        self._set_balance(_from, self._balances[_from] - _value)
+        self._set_balance(_to, self._balances[_to] + _value)
 
         if _to.is_contract:
             # If recipient is contract. Call that contracts tokenfallback function.
@@ -162,12 +283,42 @@ class TranscranialToken(IconScoreBase, IRC2TokenStandard):
         # Emits an event log `Transfer`
         self.Transfer(_from, _to, _value, _data)
 
+    def _transfer_batch(self, _from: Address, _recipients: list, _values: list, _data: bytes):
+
+        # Checks the batch, the sending values and balance.
+        if len(_recipients) != len(_values):
+            revert("Recipients and values must have the same length.")
+        if len(_recipients) > MAX_BATCH_SIZE:
+            revert(f"Can not transfer to more than {MAX_BATCH_SIZE} recipients at once.")
+
+        total_value = 0
+        for _value in _values:
+            if _value < 0:
+                revert("Transferring value cannot be less than zero.")
+            total_value += _value
+
+        if self._balances[_from] < total_value:
+            revert("Out of balance.")
+
+        self._set_balance(_from, self._balances[_from] - total_value)
+        for _to, _value in zip(_recipients, _values):
+            self._set_balance(_to, self._balances[_to] + _value)
+
+        for _to, _value in zip(_recipients, _values):
+            if _to.is_contract:
+                # If recipient is contract. Call that contracts tokenfallback function.
+                recipient_score = self.create_interface_score(_to, TokenFallbackInterface)
+                recipient_score.tokenFallback(_from, _value, _data)
+
+            # Emits an event log `Transfer`
+            self.Transfer(_from, _to, _value, _data)
+
     def _mint(self, _to: Address, _amount: int, _data: bytes) -> None:
         
         if _amount < 0:
             revert("Mint amount must be larger than zero.")
 
-        self._balances[_to] += _amount
+        self._set_balance(_to, self._balances[_to] + _amount)
         self._total_supply.set(self._total_supply.get() + _amount)
 
         if _to.is_contract:
@@ -177,6 +328,31 @@ class TranscranialToken(IconScoreBase, IRC2TokenStandard):
         self.Transfer(ZERO_SCORE_ADDRESS, _to, _amount, _data)
         self.Mint(_to, _amount, _data)
         
+    def _mint_batch(self, _recipients: list, _amounts: list, _data: bytes) -> None:
+
+        if len(_recipients) != len(_amounts):
+            revert("Recipients and amounts must have the same length.")
+        if len(_recipients) > MAX_BATCH_SIZE:
+            revert(f"Can not mint to more than {MAX_BATCH_SIZE} recipients at once.")
+
+        total_amount = 0
+        for _amount in _amounts:
+            if _amount < 0:
+                revert("Mint amount must be larger than zero.")
+            total_amount += _amount
+
+        for _to, _amount in zip(_recipients, _amounts):
+            self._set_balance(_to, self._balances[_to] + _amount)
+        self._total_supply.set(self._total_supply.get() + total_amount)
+
+        for _to, _amount in zip(_recipients, _amounts):
+            if _to.is_contract:
+                recipient_score = self.create_interface_score(_to, TokenFallbackInterface)
+                recipient_score.tokenFallback(ZERO_SCORE_ADDRESS, _amount, _data)
+
+            self.Transfer(ZERO_SCORE_ADDRESS, _to, _amount, _data)
+            self.Mint(_to, _amount, _data)
+
     def _burn(self, _from: Address, _amount: int, _data: bytes) -> None:
         
         if _amount <= 0:
@@ -186,7 +362,7 @@ class TranscranialToken(IconScoreBase, IRC2TokenStandard):
             revert("Burn amount larger than available balance.")
 
         self._total_supply.set(self._total_supply.get() - _amount)
-        self._balances[_from] -= _amount
+        self._set_balance(_from, self._balances[_from] - _amount)
 
         # Emit eventlogs.
         self.Burn(_from, _amount, _data)
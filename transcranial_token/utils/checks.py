@@ -1,4 +1,5 @@
 from iconservice import *
+from ..scorelib.role_registry import Role
 
 
 def only_admin(func):
@@ -31,7 +32,7 @@ def only_minters(func):
 
 	@wraps(func)
 	def __wrapper(self: object, *args, **kwargs):
-		if not self.msg.sender in self._minters:
+		if not self._roles.has_role(self.msg.sender, Role.MINTER):
 			revert(f"Only minters can call this function.")
 
 		return func(self, *args, **kwargs)
@@ -43,7 +44,7 @@ def only_burners(func):
 
 	@wraps(func)
 	def __wrapper(self: object, *args, **kwargs):
-		if not self.msg.sender in self._burners:
+		if not self._roles.has_role(self.msg.sender, Role.BURNER):
 			revert(f"Only burners can call this function.")
 
 		return func(self, *args, **kwargs)